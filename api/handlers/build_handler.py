@@ -1,37 +1,69 @@
 # api/handlers/build_handler.py
 
-from api.services.llm_generator import generate_app_code, generate_test_app_code
-from api.services.github_service import push_to_github
-from api.services.notifier import notify_evaluation
+import asyncio
+import functools
+import logging
+import time
 
+from api.services.attachments import store_attachments
+from api.services.llm_generator import generate_app_code, generate_test_app_code, stream_app_code, LLM_STREAMING
+from api.services.github_service import push_to_github, push_stream_to_github
+from api.services.notifier import notification_outbox, notify_evaluation
+from api.services.pages_tracker import pages_tracker
+from api.services.repo_pool import repo_pool
 
-def handle_build_request(payload) -> dict:
+logger = logging.getLogger("app2app.build")
+
+
+async def handle_build_request(payload) -> dict:
     """
     Handles round 1 (Build) requests:
-    1. Generate code from brief
-    2. Push to GitHub and enable Pages
-    3. Notify evaluation server
+    1. Generate code from brief and attachments
+    2. Push code and attachments to GitHub (into a pre-warmed repo from the
+       pool when one is ready) and enable Pages
+    3. Notify evaluation server once GitHub Pages is live
     """
 
-    # Generate minimal app code using LLM
-    print(f"Generating app code for task '{payload.task}'...")
-    code_files = generate_app_code(payload.brief)
-    print(f"App code generated: {list(code_files.keys())}")
+    # Decode attachments to the local store; only their paths are kept in memory
+    attachments = await asyncio.to_thread(store_attachments, payload.attachments)
+    # Finished jobs keep their payload around; drop the encoded data now it is on disk
+    payload.attachments = [a.to_dict() for a in attachments]
+
+    if LLM_STREAMING:
+        # Generate and push concurrently: each file is uploaded as soon as the LLM finishes it
+        logger.info(f"Generating and pushing app code for task '{payload.task}'...")
+        repo_url, commit_sha, pages_url, code_files = await push_stream_to_github(
+            payload.task,
+            stream_app_code(payload.brief, attachments),
+            attachments,
+            repo_pool.get_or_claim_repo
+        )
+        logger.info(f"App code generated: {list(code_files.keys())}")
+    else:
+        # Generate minimal app code using LLM
+        logger.info(f"Generating app code for task '{payload.task}'...")
+        code_files = await asyncio.to_thread(generate_app_code, payload.brief, attachments)
+        logger.info(f"App code generated: {list(code_files.keys())}")
+
+        # Push code to GitHub
+        logger.info("Pushing code to GitHub...")
+        repo_url, commit_sha, pages_url = await push_to_github(
+            payload.task, code_files, attachments, repo_pool.get_or_claim_repo
+        )
+
+    logger.info(f"Repo URL: {repo_url}, Commit SHA: {commit_sha}, Pages URL: {pages_url}")
 
     # Log README.md snippet if it exists
     if "README.md" in code_files:
         readme_snippet = "\n".join(code_files["README.md"].splitlines()[:5])
-        print(f"README.md preview:\n{readme_snippet}")
-
-    # Push code to GitHub
-    print(f"Pushing code to GitHub...")
-    repo_url, commit_sha, pages_url = push_to_github(payload.task, code_files)
-    print(f"Repo URL: {repo_url}, Commit SHA: {commit_sha}, Pages URL: {pages_url}")
+        logger.info(f"README.md preview:\n{readme_snippet}")
 
     # Notify evaluation server
     if payload.evaluation_url:
-        print(f"Notifying evaluation server at {payload.evaluation_url}...")
-        notify_evaluation(
+        # Notify only once the site is live, so the evaluator does not load a page still building
+        logger.info(f"Notification to {payload.evaluation_url} will be sent once GitHub Pages is live")
+        # Held in the outbox right away, so a crash while waiting cannot lose it
+        outbox_id = notify_evaluation(
             evaluation_url=payload.evaluation_url,
             email=payload.email,
             task=payload.task,
@@ -39,10 +71,14 @@ def handle_build_request(payload) -> dict:
             nonce=payload.nonce,
             repo_url=repo_url,
             commit_sha=commit_sha,
-            pages_url=pages_url
+            pages_url=pages_url,
+            hold_until=time.time() + pages_tracker.timeout
+        )
+        pages_tracker.track(
+            payload.task, commit_sha, pages_url, functools.partial(notification_outbox.release, outbox_id)
         )
     else:
-        print("No evaluation URL provided; skipping notification.")
+        logger.info("No evaluation URL provided; skipping notification.")
 
     # Return response for FastAPI
     response = {
@@ -1,82 +1,105 @@
 # api/handlers/revise_handler.py
 
-from api.services.llm_generator import generate_app_code
-from api.services.github_service import push_to_github
-from api.services.notifier import notify_evaluation
-from github import Github, GithubException
+import asyncio
+import functools
+import logging
 import os
-from typing import Dict
+import time
+
+from api.services.attachments import store_attachments
+from api.services.llm_generator import generate_app_code, generate_revision
+from api.services.github_service import get_repo, get_head, read_files, commit_files
+from api.services.github_client import GitHubError
+from api.services.metrics import count
+from api.services.patching import PatchError, is_text_path
+from api.services.notifier import notification_outbox, notify_evaluation
+from api.services.pages_tracker import pages_tracker
 from dotenv import load_dotenv
 
+logger = logging.getLogger("app2app.revise")
+
 # Load environment variables first
 load_dotenv()
 
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_USER = os.getenv("GITHUB_USER")
+# "patch": send the current files and ask the model only for changes; "full": regenerate every file
+REVISE_MODE = os.getenv("REVISE_MODE", "patch").lower()
+# Text files larger than this are not sent to the model (and left unchanged) in patch mode
+REVISE_MAX_FILE_BYTES = int(os.getenv("REVISE_MAX_FILE_BYTES", str(100 * 1024)))
 
 
-def handle_revise_request(payload) -> dict:
+async def handle_revise_request(payload) -> dict:
     """
     Handles round 2 (Revise) requests:
-    1. Generate updated code from new brief
-    2. Update the existing GitHub repo
-    3. Notify evaluation server
+    1. Get the existing repo
+    2. Generate the changes for the new brief against the current files
+       (or regenerate every file if that fails)
+    3. Update the existing GitHub repo
+    4. Notify evaluation server once GitHub Pages is live
     """
 
-    # Step 1: Generate updated app code using LLM
-    print(f"Generating updated app code for task '{payload.task}'...")
-    code_files = generate_app_code(payload.brief)
-    print(f"Updated app code generated: {list(code_files.keys())}")
+    attachments = await asyncio.to_thread(store_attachments, payload.attachments)
+    # Finished jobs keep their payload around; drop the encoded data now it is on disk
+    payload.attachments = [a.to_dict() for a in attachments]
 
-    # Step 2: Connect to GitHub and get repo
-    g = Github(GITHUB_TOKEN)
+    # Step 1: Get the existing repo
     try:
-        user = g.get_user()
-        repo = user.get_repo(payload.task)
-        print(f"Found existing repo {repo.full_name}")
-    except GithubException as e:
-        print(f"Repo not found: {e}")
+        repo = await get_repo(payload.task)
+        logger.info(f"Found existing repo {repo['full_name']}")
+    except GitHubError as e:
+        logger.warning(f"Repo not found: {e}")
         raise e
 
-    # Step 3: Update files in repo
-    for filename, content in code_files.items():
+    # Step 2: Generate updated app code using LLM
+    head = None
+    code_files = None
+    mode = "full"
+    if REVISE_MODE == "patch":
         try:
-            existing_file = repo.get_contents(filename, ref="main")
-            repo.update_file(
-                path=filename,
-                message=f"Update {filename} (round 2)",
-                content=content,
-                sha=existing_file.sha,
-                branch="main"
-            )
-            print(f"Updated {filename} in {repo.full_name}")
-        except GithubException:
-            repo.create_file(
-                path=filename,
-                message=f"Add {filename} (round 2)",
-                content=content,
-                branch="main"
-            )
-            print(f"Created {filename} in {repo.full_name}")
-
-    # Get latest commit SHA after updates
-    commit_sha = repo.get_commits()[0].sha
-
-    # Step 4: Notify evaluation server
+            head, code_files = await revise_current_files(payload, attachments)
+            mode = "patch"
+        except Exception as e:
+            logger.warning(f"Incremental revision failed ({e}); regenerating all files")
+            count("revise_patch_fallback")
+    if code_files is None:
+        logger.info(f"Generating updated app code for task '{payload.task}'...")
+        code_files = await asyncio.to_thread(generate_app_code, payload.brief, attachments)
+    logger.info(f"Updated app code generated ({mode}): {list(code_files.keys())}")
+
+    # Step 3: Commit only the files whose content changed, in a single commit
+    commit_sha, changes = await commit_files(
+        payload.task,
+        code_files,
+        f"Update app files (round {payload.round})",
+        attachments,
+        head
+    )
+    logger.info(
+        f"Files added: {len(changes['added'])}, modified: {len(changes['modified'])}, "
+        f"unchanged: {len(changes['unchanged'])}"
+    )
+
+    # Step 4: Notify evaluation server once the new commit is deployed
+    pages_url = f"https://{GITHUB_USER}.github.io/{payload.task}/"
     if payload.evaluation_url:
-        print(f"Notifying evaluation server at {payload.evaluation_url}...")
-        notify_evaluation(
+        logger.info(f"Notification to {payload.evaluation_url} will be sent once GitHub Pages is live")
+        # Held in the outbox right away, so a crash while waiting cannot lose it
+        outbox_id = notify_evaluation(
             evaluation_url=payload.evaluation_url,
             email=payload.email,
             task=payload.task,
             round_number=payload.round,
             nonce=payload.nonce,
-            repo_url=repo.html_url,
+            repo_url=repo["html_url"],
             commit_sha=commit_sha,
-            pages_url=f"https://{GITHUB_USER}.github.io/{payload.task}/"
+            pages_url=pages_url,
+            hold_until=time.time() + pages_tracker.timeout
+        )
+        pages_tracker.track(
+            payload.task, commit_sha, pages_url, functools.partial(notification_outbox.release, outbox_id)
         )
     else:
-        print("No evaluation URL provided; skipping notification.")
+        logger.info("No evaluation URL provided; skipping notification.")
 
     # Step 5: Return response
     response = {
@@ -86,9 +109,45 @@ def handle_revise_request(payload) -> dict:
         "task": payload.task,
         "round": payload.round,
         "nonce": payload.nonce,
-        "repo_url": repo.html_url,
+        "repo_url": repo["html_url"],
         "commit_sha": commit_sha,
-        "pages_url": f"https://{GITHUB_USER}.github.io/{payload.task}/"
+        "pages_url": pages_url,
+        "files_added": len(changes["added"]),
+        "files_modified": len(changes["modified"]),
+        "files_unchanged": len(changes["unchanged"]),
+        "revise_mode": mode
     }
 
     return response
+
+
+async def revise_current_files(payload, attachments):
+    """
+    Load the text files on main and ask the model only for the changes the
+    new brief needs, so output size follows the size of the change.
+
+    Returns:
+        head: the get_head result, reused for the commit
+        code_files: path -> new content for the changed and added files
+
+    Raises:
+        GitHubError: if main cannot be read
+        PatchError: if the revision is malformed or does not apply
+    """
+    head = await get_head(payload.task)
+    existing = head[2]
+    attachment_names = {a.name for a in attachments}
+    wanted = {
+        path: sha for path, sha in existing.items()
+        if is_text_path(path) and path not in attachment_names
+    }
+    current_files = await read_files(payload.task, wanted, REVISE_MAX_FILE_BYTES)
+    if "index.html" not in current_files:
+        raise PatchError("index.html is not on main")
+    other_files = [path for path in existing if path not in current_files]
+
+    logger.info(f"Revising {len(current_files)} current files for task '{payload.task}'...")
+    code_files = await asyncio.to_thread(
+        generate_revision, payload.brief, current_files, attachments, other_files
+    )
+    return head, code_files
@@ -1,6 +1,8 @@
 # api/main.py
+import logging
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
@@ -8,16 +10,40 @@ from typing import Optional, List, Dict, Any
 
 from api.handlers.build_handler import handle_build_request
 from api.handlers.revise_handler import handle_revise_request
+from api.services.idempotency import idempotency_key, idempotency_store
+from api.services.job_queue import JobQueue, NonceConflictError, QueueFullError
+from api.services.llm_cache import generation_cache
+from api.services.llm_providers import llm_router
+from api.services.github_client import github_client
+from api.services.github_service import rate_limiter
+from api.services.notifier import notification_outbox
+from api.services.pages_tracker import pages_tracker
+from api.services.repo_pool import repo_pool
+from api.services.state_store import state_store
+from api.services import metrics
+
+logger = logging.getLogger("app2app.main")
 
 # Load environment variables (for local development)
 load_dotenv()
 
+# Structured logs tagged with the task's trace ID (its nonce)
+metrics.configure_logging()
+
 # Create FastAPI app
 app = FastAPI(title="LLM Code Deployment API")
 
 # Secret from environment
 STUDENT_SECRET = os.getenv("STUDENT_SECRET")
 
+# Worker processes started by `python -m api.main`; they share state through SQLite
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Set to 1 for auto-reload during development (single process only)
+UVICORN_RELOAD = os.getenv("UVICORN_RELOAD", "0") == "1"
+
+# Build/revise jobs run in the background on a bounded worker pool
+job_queue = JobQueue()
+
 
 # Define the expected request structure
 class RequestPayload(BaseModel):
@@ -32,12 +58,35 @@ class RequestPayload(BaseModel):
     attachments: Optional[List[Dict[str, Any]]] = None
 
 
+@app.on_event("startup")
+async def startup():
+    await github_client.start()
+    await notification_outbox.start()
+    await pages_tracker.start()
+    await repo_pool.start()
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await repo_pool.stop()
+    # Notifications still waiting on Pages are queued now so they survive the restart
+    await pages_tracker.stop()
+    await notification_outbox.stop()
+    await github_client.close()
+    state_store.close()
+    metrics.mark_process_dead()
+
+
 @app.post("/")
 async def handle_request(payload: RequestPayload, request: Request):
     """
     Handles the instructor's POST request.
     1. Verifies secret.
-    2. Routes round 1 requests to build_handler.
+    2. Enqueues round 1 requests for build_handler and round 2 for revise_handler,
+       unless the same (email, task, round, nonce) was already accepted.
+    3. Returns immediately; progress is available from GET /jobs/{nonce}.
     """
 
     # Verify secret
@@ -45,30 +94,94 @@ async def handle_request(payload: RequestPayload, request: Request):
         raise HTTPException(status_code=403, detail="Invalid secret")
 
     # Log received task
-    print(f"Received task '{payload.task}' (round {payload.round}) from {payload.email}")
+    metrics.trace_id.set(payload.nonce)
+    logger.info(f"Received task '{payload.task}' (round {payload.round}) from {payload.email}")
 
     # Handle Build (round 1)
     if payload.round == 1:
-        response = handle_build_request(payload)
-        
+        handler = handle_build_request
+
     # Handle Revise (round 2)
     elif payload.round == 2:
-        response = handle_revise_request(payload)
+        handler = handle_revise_request
 
     else:
         response = {
             "status": "error",
             "message": f"Round {payload.round} not implemented yet"
         }
+        return JSONResponse(status_code=200, content=response)
+
+    # A retried request attaches to the job already handling it instead of redoing the work
+    key = idempotency_key(payload.email, payload.task, payload.round, payload.nonce)
+    try:
+        job, duplicate = idempotency_store.submit_once(
+            key,
+            lambda: job_queue.submit(payload.nonce, handler, payload, key),
+            job_queue.get
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except NonceConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if duplicate:
+        logger.info(f"Duplicate request; attaching to existing job ({job.status})")
+        metrics.count("idempotent_duplicate")
+
+    response = {
+        "status": "ok",
+        "message": "Request already accepted" if duplicate else "Request accepted",
+        "email": payload.email,
+        "task": payload.task,
+        "round": payload.round,
+        "nonce": payload.nonce,
+        "job_status": job.status,
+        "job_url": f"/jobs/{payload.nonce}"
+    }
+    if job.status == "succeeded":
+        response["result"] = job.result
 
     return JSONResponse(status_code=200, content=response)
 
 
+@app.get("/jobs/{nonce}")
+async def get_job(nonce: str):
+    """Returns the status (and result once finished) of a build/revise job"""
+    job = job_queue.get(nonce)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found for nonce {nonce}")
+    return job.to_dict()
+
+
 @app.get("/health")
 async def health():
     """Simple health check endpoint"""
-    return {"status": "alive"}
-
+    return {
+        "status": "alive",
+        "jobs": job_queue.stats(),
+        "idempotency": idempotency_store.stats(),
+        "llm_cache": generation_cache.stats(),
+        "llm_providers": llm_router.stats(),
+        "github_budget": rate_limiter.snapshot(),
+        "pages": pages_tracker.stats(),
+        "repo_pool": repo_pool.stats(),
+        "notifications": notification_outbox.stats()
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: stage/job/GitHub latency histograms, event counters and queue gauges"""
+    for status, value in job_queue.stats().items():
+        if status != "workers":
+            metrics.JOBS.labels(status).set(value)
+    for field, value in rate_limiter.snapshot().items():
+        if isinstance(value, (int, float)):
+            metrics.GITHUB_BUDGET.labels(field).set(value)
+    for status, value in notification_outbox.stats().items():
+        metrics.NOTIFICATIONS.labels(status).set(value)
+    metrics.LLM_CACHE_ENTRIES.set(generation_cache.stats().get("entries", 0))
+    return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -76,4 +189,7 @@ if __name__ == "__main__":
 
     # Use PORT environment variable if available (Render sets this automatically)
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("api.main:app", host="0.0.0.0", port=port, reload=True)
+    if UVICORN_RELOAD:
+        uvicorn.run("api.main:app", host="0.0.0.0", port=port, reload=True)
+    else:
+        uvicorn.run("api.main:app", host="0.0.0.0", port=port, workers=WEB_CONCURRENCY)
@@ -0,0 +1,231 @@
+# api/services/attachments.py
+
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import unquote_to_bytes
+
+import httpx
+from dotenv import load_dotenv
+
+from api.services.metrics import count
+from api.services.utils import git_blob_sha_file
+
+logger = logging.getLogger("app2app.attachments")
+
+load_dotenv()
+
+# Content-addressed store shared by all tasks: one file per distinct content
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", "results/attachments")
+# Largest single attachment accepted, and total per request, in bytes
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))
+ATTACHMENTS_MAX_TOTAL_BYTES = int(os.getenv("ATTACHMENTS_MAX_TOTAL_BYTES", str(25 * 1024 * 1024)))
+# Stored attachments unused for this many seconds are deleted
+ATTACHMENTS_RETENTION = int(os.getenv("ATTACHMENTS_RETENTION", str(7 * 24 * 3600)))
+# Bytes of a text attachment shown to the LLM
+ATTACHMENT_PROMPT_PREVIEW = int(os.getenv("ATTACHMENT_PROMPT_PREVIEW", "2000"))
+
+# Base64 characters decoded per step (a multiple of 4); bounds memory per attachment
+DECODE_CHUNK = 64 * 1024
+READ_CHUNK = 64 * 1024
+
+_DATA_URI = re.compile(r"^data:(?P<mime>[^;,]*)(?P<params>(;[^;,]*)*),", re.IGNORECASE)
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class AttachmentError(ValueError):
+    """Raised when an attachment cannot be decoded or exceeds the size limits."""
+
+
+class Attachment:
+    """
+    A decoded attachment stored on disk under its SHA-256.
+
+    Only the path is kept, never the content, so large attachments do not
+    stay in worker memory; read it back with chunks().
+    """
+
+    def __init__(self, name: str, path: str, size: int, sha256: str, git_sha: str, mime_type: str):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.git_sha = git_sha
+        self.mime_type = mime_type
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "size": self.size, "sha256": self.sha256, "mime_type": self.mime_type}
+
+    def chunks(self, size: int = READ_CHUNK) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                yield chunk
+
+    @property
+    def is_text(self) -> bool:
+        return self.mime_type.startswith("text/") or self.mime_type in ("application/json", "application/xml")
+
+    def preview(self, limit: int = ATTACHMENT_PROMPT_PREVIEW) -> Optional[str]:
+        """First bytes of a text attachment, for the prompt."""
+        if not self.is_text:
+            return None
+        with open(self.path, "rb") as f:
+            data = f.read(limit)
+        return data.decode("utf-8", errors="replace")
+
+
+def safe_name(name: str, index: int) -> str:
+    """Reduce an attachment name to a plain file name that is safe as a repo path."""
+    name = _UNSAFE.sub("_", os.path.basename(name or "")).strip("._")
+    return name or f"attachment-{index}"
+
+
+def _decode_data_uri(url: str, out, limit: int) -> str:
+    """Decode a data: URI into the open binary file out, chunk by chunk. Returns the MIME type."""
+    match = _DATA_URI.match(url[:1024])
+    if match is None:
+        raise AttachmentError("Malformed data URI")
+    mime_type = match.group("mime") or "text/plain"
+    is_base64 = ";base64" in match.group("params").lower()
+    start = match.end()
+
+    if not is_base64:
+        data = unquote_to_bytes(url[start:])
+        if len(data) > limit:
+            raise AttachmentError(f"Attachment larger than {limit} bytes")
+        out.write(data)
+        return mime_type
+
+    # Decode 4-character groups only; carry the remainder over to the next chunk
+    written = 0
+    carry = ""
+    for offset in range(start, len(url), DECODE_CHUNK):
+        text = carry + _WHITESPACE.sub("", url[offset:offset + DECODE_CHUNK])
+        usable = len(text) - len(text) % 4
+        carry = text[usable:]
+        try:
+            data = base64.b64decode(text[:usable], validate=True)
+        except binascii.Error as e:
+            raise AttachmentError(f"Invalid base64 data: {e}")
+        written += len(data)
+        if written > limit:
+            raise AttachmentError(f"Attachment larger than {limit} bytes")
+        out.write(data)
+    if carry:
+        raise AttachmentError("Truncated base64 data")
+    return mime_type
+
+
+def _download(url: str, out, limit: int) -> str:
+    """Stream an http(s) attachment into out. Returns the MIME type."""
+    written = 0
+    with httpx.stream("GET", url, timeout=30, follow_redirects=True) as resp:
+        resp.raise_for_status()
+        for data in resp.iter_bytes(READ_CHUNK):
+            written += len(data)
+            if written > limit:
+                raise AttachmentError(f"Attachment larger than {limit} bytes")
+            out.write(data)
+        return resp.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+
+
+def store_attachment(attachment: Dict[str, Any], index: int = 0, limit: int = ATTACHMENT_MAX_BYTES) -> Attachment:
+    """
+    Decode one request attachment ({"name": ..., "url": "data:...;base64,..."}
+    or an http(s) URL) into the content-addressed store.
+
+    The content is decoded straight to a temporary file while being hashed;
+    if the same content is already stored the temporary file is dropped.
+
+    Raises:
+        AttachmentError: if the attachment is malformed or larger than limit
+    """
+    url = attachment.get("url") or attachment.get("data") or ""
+    name = safe_name(attachment.get("name", ""), index)
+    os.makedirs(ATTACHMENTS_DIR, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=ATTACHMENTS_DIR, prefix=".incoming-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if url.startswith("data:"):
+                mime_type = _decode_data_uri(url, out, limit)
+            elif url.startswith(("http://", "https://")):
+                try:
+                    mime_type = _download(url, out, limit)
+                except httpx.HTTPError as e:
+                    raise AttachmentError(f"Could not download attachment: {e}")
+            else:
+                raise AttachmentError("Attachment URL must be a data: or http(s) URL")
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        path = os.path.join(ATTACHMENTS_DIR, sha256)
+        if os.path.exists(path):
+            os.utime(path)
+            count("attachment_dedup")
+        else:
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return Attachment(name, path, size, sha256, git_blob_sha_file(path), mime_type)
+
+
+def store_attachments(attachments: Optional[List[Dict[str, Any]]]) -> List[Attachment]:
+    """
+    Decode every attachment of a request. Attachments that are malformed or
+    over the size limits are skipped with a warning rather than failing the task.
+    """
+    stored: List[Attachment] = []
+    names = set()
+    budget = ATTACHMENTS_MAX_TOTAL_BYTES
+    for index, attachment in enumerate(attachments or []):
+        try:
+            item = store_attachment(attachment, index, min(ATTACHMENT_MAX_BYTES, budget))
+        except AttachmentError as e:
+            logger.warning(f"Skipping attachment {attachment.get('name')!r}: {e}")
+            count("attachment_rejected")
+            continue
+        if item.name in names:
+            logger.warning(f"Skipping duplicate attachment name {item.name!r}")
+            continue
+        names.add(item.name)
+        budget -= item.size
+        stored.append(item)
+    if stored:
+        logger.info(f"Stored {len(stored)} attachments ({sum(a.size for a in stored)} bytes)")
+    prune_attachments()
+    return stored
+
+
+def prune_attachments(retention: int = ATTACHMENTS_RETENTION) -> int:
+    """Delete stored attachments not used within the retention period. Returns the number removed."""
+    if not retention or not os.path.isdir(ATTACHMENTS_DIR):
+        return 0
+    cutoff = time.time() - retention
+    removed = 0
+    for entry in os.scandir(ATTACHMENTS_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -0,0 +1,138 @@
+# api/services/github_client.py
+
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# Upper bound on open connections to the GitHub API shared by all requests
+GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS", "20"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+
+
+class GitHubError(Exception):
+    """Raised when the GitHub API answers with an error status."""
+
+    def __init__(self, status: int, message: str, data: Any = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+        self.data = data
+
+
+class GitHubClient:
+    """
+    Async GitHub REST client sharing one pooled HTTP/2 connection set.
+
+    A single instance lives for the whole application lifecycle (opened on
+    FastAPI startup and closed on shutdown), so requests reuse keep-alive
+    connections instead of paying a new TLS handshake each time.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = GITHUB_TOKEN,
+        base_url: str = GITHUB_API_URL,
+        max_connections: int = GITHUB_MAX_CONNECTIONS,
+        timeout: float = GITHUB_TIMEOUT
+    ):
+        self.token = token
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if self.token:
+            headers["Authorization"] = f"token {self.token}"
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            http2=True,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Any = None,
+        content: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Send a request and return the raw response, whatever its status.
+
+        content, if given, is sent as the raw body instead of json; an async
+        iterable of bytes is streamed.
+        """
+        if self._client is None:
+            await self.start()
+        return await self._client.request(
+            method, path, json=json, content=content, params=params, headers=headers
+        )
+
+    @staticmethod
+    def decode(resp: httpx.Response) -> Any:
+        """
+        Return the decoded JSON body of a response.
+
+        Raises:
+            GitHubError: if the response status is 400 or above
+        """
+        if resp.status_code >= 400:
+            try:
+                data = resp.json()
+                message = data.get("message", resp.text)
+            except ValueError:
+                data, message = None, resp.text
+            raise GitHubError(resp.status_code, message, data)
+        if resp.status_code == 204 or not resp.content:
+            return None
+        return resp.json()
+
+    async def call(self, method: str, path: str, **kwargs) -> Any:
+        """
+        Send a request and return its decoded JSON body.
+
+        Raises:
+            GitHubError: if the response status is 400 or above
+        """
+        return self.decode(await self.request(method, path, **kwargs))
+
+    async def get(self, path: str, **kwargs) -> Any:
+        return await self.call("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> Any:
+        return await self.call("POST", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs) -> Any:
+        return await self.call("PATCH", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> Any:
+        return await self.call("PUT", path, **kwargs)
+
+
+github_client = GitHubClient()
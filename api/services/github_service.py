@@ -1,12 +1,21 @@
 # api/services/github_service.py
 
 from dotenv import load_dotenv
+import asyncio
+import base64
+import logging
 import os
-from github import Github
-from github.GithubException import GithubException
-from typing import Dict, Tuple
-import requests
 import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from api.services.attachments import Attachment
+from api.services.github_client import github_client, GitHubClient, GitHubError
+from api.services.metrics import GITHUB_REQUEST_SECONDS, count, endpoint_template, span
+from api.services.utils import git_blob_sha
+
+logger = logging.getLogger("app2app.github")
 
 load_dotenv()
 
@@ -14,13 +23,499 @@ load_dotenv()
 GITHUB_USER = os.getenv("GITHUB_USER")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-def push_to_github(task_name: str, code_files: Dict[str, str]) -> Tuple[str, str, str]:
+BRANCH = "main"
+
+# Sustained request rate and burst size allowed towards the GitHub API (for the whole deployment)
+GITHUB_REQUESTS_PER_SECOND = float(os.getenv("GITHUB_REQUESTS_PER_SECOND", "10"))
+GITHUB_BURST = int(os.getenv("GITHUB_BURST", "30"))
+# Worker processes sharing the token; each one gets an equal share of the rate and burst
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Requests kept in reserve from the hourly quota before calls start queueing
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "50"))
+# Attempts per call when GitHub answers with a (secondary) rate limit error
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+
+
+class RateLimitScheduler:
+    """
+    Central token-bucket scheduler for every GitHub API call of the process.
+
+    All in-flight jobs draw from one bucket refilled at `rate` tokens per
+    second, which keeps bursts under GitHub's secondary limits. Once the
+    hourly quota reported by X-RateLimit-Remaining drops to the reserve, or
+    a response carries Retry-After, the bucket pauses until GitHub allows
+    requests again (X-RateLimit-Reset). Callers queue in acquire() instead
+    of failing.
+    """
+
+    def __init__(
+        self,
+        rate: float = GITHUB_REQUESTS_PER_SECOND,
+        burst: int = GITHUB_BURST,
+        reserve: int = GITHUB_RATE_LIMIT_RESERVE
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.throttled = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _effective_rate(self) -> float:
+        # Spend the hourly quota at full speed; only once it is down to the
+        # reserve do requests wait for the reset (unless the reset has passed
+        # and the last known quota is stale)
+        if (
+            self.remaining is not None
+            and self.reset_at is not None
+            and self.reset_at > time.time()
+            and self.remaining <= self.reserve
+        ):
+            return 0.0
+        return self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self._effective_rate())
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent and take one token."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self.waiting += 1
+        try:
+            # Serialize waiters so tokens are handed out in arrival order
+            async with self._lock:
+                while True:
+                    pause = self.paused_until - time.time()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                        continue
+                    self._refill()
+                    rate = self._effective_rate()
+                    # Tokens left in the bucket must not dip into the reserve either
+                    if rate > 0 and self.tokens >= 1:
+                        self.tokens -= 1
+                        if self.remaining is not None:
+                            # Count it now; the response headers correct the estimate
+                            self.remaining -= 1
+                        return
+                    if rate > 0:
+                        await asyncio.sleep((1 - self.tokens) / rate)
+                    else:
+                        # Quota is down to the reserve: wait for the hourly reset
+                        self.paused_until = self.reset_at or time.time() + 60
+        finally:
+            self.waiting -= 1
+
+    def update(self, resp: httpx.Response) -> bool:
+        """
+        Record the rate-limit headers of a response.
+
+        Returns:
+            True if the response was a rate-limit rejection that should be retried
+        """
+        headers = resp.headers
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in headers:
+            self.reset_at = float(headers["X-RateLimit-Reset"])
+
+        limited = resp.status_code == 429 or (
+            resp.status_code == 403
+            and ("Retry-After" in headers or self.remaining == 0 or "rate limit" in resp.text.lower())
+        )
+        if not limited:
+            return False
+
+        self.throttled += 1
+        if "Retry-After" in headers:
+            wait_until = time.time() + float(headers["Retry-After"])
+        elif self.remaining == 0 and self.reset_at:
+            wait_until = self.reset_at
+        else:
+            # Secondary limit without a hint: GitHub asks for at least a minute
+            wait_until = time.time() + 60
+        self.paused_until = max(self.paused_until, wait_until)
+        logger.warning(f"GitHub rate limit hit; pausing API calls for {wait_until - time.time():.0f}s")
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current budget, for /health and metrics."""
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "effective_rate": round(self._effective_rate(), 3),
+            "remaining": self.remaining,
+            "limit": self.limit,
+            "reset_at": self.reset_at,
+            "paused_for": round(max(0.0, self.paused_until - time.time()), 1),
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+        }
+
+
+rate_limiter = RateLimitScheduler(
+    rate=GITHUB_REQUESTS_PER_SECOND / WEB_CONCURRENCY,
+    burst=max(1, GITHUB_BURST // WEB_CONCURRENCY)
+)
+
+
+async def github_request(method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Send a GitHub API request through the rate-limit scheduler, retrying
+    rate-limit rejections once the scheduler allows it, and return the raw response.
+    """
+    endpoint = endpoint_template(path)
+    for attempt in range(GITHUB_MAX_RETRIES):
+        await rate_limiter.acquire()
+        start = time.perf_counter()
+        resp = await github_client.request(method, path, **kwargs)
+        GITHUB_REQUEST_SECONDS.labels(method, endpoint, str(resp.status_code)).observe(time.perf_counter() - start)
+        if not rate_limiter.update(resp):
+            return resp
+        count("github_rate_limited_retry")
+    return resp
+
+
+async def github_api(method: str, path: str, **kwargs) -> Any:
+    """
+    Scheduled GitHub API call returning the decoded JSON body.
+
+    Raises:
+        GitHubError: if the final response status is 400 or above
+    """
+    return GitHubClient.decode(await github_request(method, path, **kwargs))
+
+
+async def get_repo(task_name: str) -> dict:
+    """
+    Return the user's repo named after the task.
+
+    Raises:
+        GitHubError: with status 404 if it does not exist
+    """
+    return await github_api("GET", f"/repos/{GITHUB_USER}/{task_name}")
+
+
+async def get_or_create_repo(task_name: str) -> dict:
+    """
+    Return the user's repo named after the task, creating it (with an MIT
+    license so that the main branch exists) if it does not exist yet.
+    """
+    try:
+        repo = await get_repo(task_name)
+        logger.info(f"Repo '{task_name}' already exists. Using existing repo.")
+    except GitHubError as e:
+        if e.status == 404:
+            # Repo doesn't exist → create new
+            repo = await github_api("POST", "/user/repos", json={
+                "name": task_name,
+                "private": False,
+                "auto_init": False,
+                "description": f"Generated by LLM Code Deployment for task {task_name}",
+                "license_template": "mit"
+            })
+            logger.info(f"Created new repo {repo['full_name']}")
+        else:
+            raise e
+    return repo
+
+
+async def get_head(task_name: str) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Read the current state of main with one ref, one commit and one
+    recursive tree call.
+
+    Returns:
+        head_sha: SHA of the commit main points to
+        base_tree_sha: SHA of that commit's tree
+        existing: dict of path -> blob SHA for every file on main
+
+    Raises:
+        GitHubError: with status 404/409 if the repo has no main branch yet
+    """
+    repo_path = f"/repos/{GITHUB_USER}/{task_name}"
+    ref = await github_api("GET", f"{repo_path}/git/ref/heads/{BRANCH}")
+    head_sha = ref["object"]["sha"]
+    base_commit = await github_api("GET", f"{repo_path}/git/commits/{head_sha}")
+    base_tree_sha = base_commit["tree"]["sha"]
+
+    tree = await github_api(
+        "GET", f"{repo_path}/git/trees/{base_tree_sha}", params={"recursive": "1"}
+    )
+    existing = {
+        element["path"]: element["sha"]
+        for element in tree["tree"]
+        if element["type"] == "blob"
+    }
+    return head_sha, base_tree_sha, existing
+
+
+async def read_files(task_name: str, blobs: Dict[str, str], max_bytes: Optional[int] = None) -> Dict[str, str]:
+    """
+    Download files from the repo by blob SHA, concurrently (through the rate limiter).
+
+    Args:
+        task_name: repo name
+        blobs: dict of path -> blob SHA, as returned by get_head
+        max_bytes: files larger than this are left out
+
+    Returns:
+        dict of path -> content for the files that are UTF-8 text within max_bytes
+    """
+    repo_path = f"/repos/{GITHUB_USER}/{task_name}"
+
+    async def read(path: str, sha: str) -> Optional[str]:
+        blob = await github_api("GET", f"{repo_path}/git/blobs/{sha}")
+        if max_bytes is not None and blob.get("size", 0) > max_bytes:
+            return None
+        try:
+            return base64.b64decode(blob["content"]).decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    contents = await asyncio.gather(*(read(path, sha) for path, sha in blobs.items()))
+    return {path: content for path, content in zip(blobs, contents) if content is not None}
+
+
+class Base64BlobBody:
+    """
+    Request body for POST git/blobs that base64-encodes a stored attachment
+    on the fly, so the file is never loaded into memory whole. Iterating it
+    again re-reads the file, which keeps rate-limit retries working.
+    """
+
+    # Multiple of 3 so chunks encode without padding
+    CHUNK = 48 * 1024
+
+    def __init__(self, attachment: Attachment):
+        self.attachment = attachment
+
+    def __aiter__(self):
+        return self._stream()
+
+    async def _stream(self):
+        yield b'{"encoding":"base64","content":"'
+        with open(self.attachment.path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.CHUNK)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield b'"}'
+
+
+async def create_attachment_blob(task_name: str, attachment: Attachment) -> str:
+    """Upload a stored attachment as a git blob, streaming its content, and return its SHA."""
+    blob = await github_api(
+        "POST",
+        f"/repos/{GITHUB_USER}/{task_name}/git/blobs",
+        content=Base64BlobBody(attachment),
+        headers={"Content-Type": "application/json"},
+    )
+    return blob["sha"]
+
+
+async def attachment_elements(
+    task_name: str,
+    attachments: List[Attachment],
+    existing: Dict[str, str],
+    changes: Dict[str, List[str]]
+) -> List[dict]:
+    """
+    Upload the attachments whose content is not on main yet and return their
+    tree elements, recording each one in changes.
+    """
+    uploads = []
+    for attachment in attachments:
+        current_sha = existing.get(attachment.name)
+        if current_sha == attachment.git_sha:
+            changes["unchanged"].append(attachment.name)
+            continue
+        changes["added" if current_sha is None else "modified"].append(attachment.name)
+        uploads.append(attachment)
+
+    shas = await asyncio.gather(*(create_attachment_blob(task_name, a) for a in uploads))
+    return [
+        {"path": attachment.name, "mode": "100644", "type": "blob", "sha": sha}
+        for attachment, sha in zip(uploads, shas)
+    ]
+
+
+async def commit_tree(
+    task_name: str,
+    head_sha: str,
+    base_tree_sha: str,
+    elements: List[dict],
+    message: str
+) -> str:
+    """
+    Create one tree on top of base_tree_sha, one commit on top of head_sha,
+    and move main to it.
+
+    Returns:
+        commit_sha: SHA of the new commit
+    """
+    repo_path = f"/repos/{GITHUB_USER}/{task_name}"
+    with span("github_commit"):
+        new_tree = await github_api("POST", f"{repo_path}/git/trees", json={
+            "base_tree": base_tree_sha,
+            "tree": elements
+        })
+        commit = await github_api("POST", f"{repo_path}/git/commits", json={
+            "message": message,
+            "tree": new_tree["sha"],
+            "parents": [head_sha]
+        })
+        await github_api("PATCH", f"{repo_path}/git/refs/heads/{BRANCH}", json={"sha": commit["sha"]})
+
+    logger.info(f"Committed {len(elements)} files to {GITHUB_USER}/{task_name} ({BRANCH}) as {commit['sha']}")
+    return commit["sha"]
+
+
+async def commit_files(
+    task_name: str,
+    code_files: Dict[str, str],
+    message: str,
+    attachments: Optional[List[Attachment]] = None,
+    head: Optional[Tuple[str, str, Dict[str, str]]] = None
+) -> Tuple[str, Dict[str, List[str]]]:
+    """
+    Commit all files to main as a single commit using the Git Data API.
+
+    Instead of one get_contents + create/update_file round trip (and one
+    commit) per file, this builds one tree on top of the current head,
+    creates one commit and moves refs/heads/main once, so the number of
+    API calls does not grow with the number of files.
+
+    The current tree is listed once and each file's git blob SHA is computed
+    locally; files whose content is already on main are left out, and no
+    commit is made at all if nothing changed.
+
+    Attachments are uploaded as blobs (streamed, base64) and committed in the
+    same tree; a generated file with the same name as an attachment is dropped.
+
+    Args:
+        task_name: repo name
+        code_files: dict of filename -> file content
+        message: commit message
+        attachments: stored request attachments to commit next to the code
+        head: result of a get_head call the caller already made, to skip reading main again
+
+    Returns:
+        commit_sha: SHA of the new commit (or of the current head if nothing changed)
+        changes: dict with "added", "modified" and "unchanged" filename lists
+    """
+    repo_path = f"/repos/{GITHUB_USER}/{task_name}"
+    attachments = attachments or []
+    attachment_names = {a.name for a in attachments}
+    files = {name: content for name, content in code_files.items() if name not in attachment_names}
+    changes = {"added": [], "modified": [], "unchanged": []}
+
+    try:
+        head_sha, base_tree_sha, existing = head or await get_head(task_name)
+    except GitHubError as e:
+        # The Git Data API cannot write to an empty repository (409), so seed
+        # the branch with the first file through the contents API.
+        if e.status not in (404, 409) or not files:
+            raise
+        filename, content = next(iter(files.items()))
+        await github_api("PUT", f"{repo_path}/contents/{filename}", json={
+            "message": message,
+            "content": base64.b64encode(content.encode("utf-8")).decode("ascii"),
+            "branch": BRANCH
+        })
+        logger.info(f"Initialized {GITHUB_USER}/{task_name} with {filename}")
+        changes["added"].append(filename)
+        del files[filename]
+        head_sha, base_tree_sha, existing = await get_head(task_name)
+
+    elements = []
+    for filename, content in files.items():
+        current_sha = existing.get(filename)
+        if current_sha is None:
+            changes["added"].append(filename)
+        elif current_sha == git_blob_sha(content):
+            changes["unchanged"].append(filename)
+            continue
+        else:
+            changes["modified"].append(filename)
+        elements.append({"path": filename, "mode": "100644", "type": "blob", "content": content})
+    elements += await attachment_elements(task_name, attachments, existing, changes)
+
+    if not elements:
+        logger.info(f"No changes to commit in {GITHUB_USER}/{task_name}")
+        return head_sha, changes
+
+    commit_sha = await commit_tree(task_name, head_sha, base_tree_sha, elements, message)
+    return commit_sha, changes
+
+
+async def enable_pages(task_name: str, check: bool = False) -> str:
+    """
+    Enable GitHub Pages for the repo from the root of main.
+
+    A failure is only logged, since the push itself succeeded, unless check
+    is set.
+
+    Returns:
+        pages_url: str
+
+    Raises:
+        GitHubError: if check is set and Pages could not be enabled
+    """
+    pages_url = f"https://{GITHUB_USER}.github.io/{task_name}/"
+    payload = {
+        "source": {
+            "branch": BRANCH,
+            "path": "/"
+        }
+    }
+    with span("pages_enable"):
+        resp = await github_request("POST", f"/repos/{GITHUB_USER}/{task_name}/pages", json=payload)
+    if resp.status_code in (201, 204):
+        logger.info(f"GitHub Pages enabled at {pages_url}")
+    elif resp.status_code == 409:
+        # Pages is already enabled for this repo
+        logger.info(f"GitHub Pages already enabled at {pages_url}")
+    elif check:
+        raise GitHubError(resp.status_code, f"Could not enable GitHub Pages: {resp.text[:500]}")
+    else:
+        logger.warning(f"Could not enable GitHub Pages: {resp.status_code}, {resp.text}")
+    return pages_url
+
+
+async def ensure_pages(task_name: str, repo: dict) -> str:
+    """Enable GitHub Pages unless the repo reports it is already on. Returns the pages_url."""
+    if repo.get("has_pages"):
+        return f"https://{GITHUB_USER}.github.io/{task_name}/"
+    return await enable_pages(task_name)
+
+
+async def push_to_github(
+    task_name: str,
+    code_files: Dict[str, str],
+    attachments: Optional[List[Attachment]] = None,
+    open_repo: Callable[[str], Awaitable[dict]] = get_or_create_repo
+) -> Tuple[str, str, str]:
     """
     Push code to GitHub, create repo, commit files, enable GitHub Pages.
 
     Args:
         task_name: Unique task identifier (used for repo name)
         code_files: dict of filename -> file content
+        attachments: stored request attachments to commit with the code
+        open_repo: returns the task's repo, creating it if needed (e.g. repo_pool.get_or_claim_repo)
 
     Returns:
         repo_url: str
@@ -28,77 +523,110 @@ def push_to_github(task_name: str, code_files: Dict[str, str]) -> Tuple[str, str
         pages_url: str
     """
 
-    g = Github(GITHUB_TOKEN)
-
     try:
         # Create a public repo
-        user = g.get_user()
-        try:
-            repo = user.get_repo(task_name)
-            print(f"Repo '{task_name}' already exists. Using existing repo.")
-        except GithubException as e:
-            if e.status == 404:
-                # Repo doesn't exist → create new
-                repo = user.create_repo(
-                    name=task_name,
-                    private=False,
-                    auto_init=False,
-                    description=f"Generated by LLM Code Deployment for task {task_name}",
-                    license_template="mit"
-                )
-                print(f"Created new repo {repo.full_name}")
-            else:
-                raise e
-
-        # Push files to repo
-        for filename, content in code_files.items():
-            path = filename
-            try:
-                existing_file = repo.get_contents(path, ref="main")
-                # If the file exists, update it on main
-                repo.update_file(
-                    path=path,
-                    message=f"Update {filename}",
-                    content=content,
-                    sha=existing_file.sha,
-                    branch="main"
-                )
-                print(f"Updated {filename} in {repo.full_name} (main)")
-            except GithubException as e:
-                # If the file doesn’t exist -> 404 from get_contents -> create it
-                if e.status == 404:
-                    repo.create_file(
-                        path=path,
-                        message=f"Add {filename}",
-                        content=content,
-                        branch="main"
-                    )
-                    print(f"Created {filename} in {repo.full_name} (main)")
-                else:
-                    # re-raise other Github exceptions so caller can handle/log them
-                    raise
-
-        # Get latest commit SHA
-        commit_sha = repo.get_commits()[0].sha
-
-        # Enable GitHub Pages
-        pages_url = f"https://{GITHUB_USER}.github.io/{task_name}/"
-        api_url = f"https://api.github.com/repos/{GITHUB_USER}/{task_name}/pages"
-        headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-        payload = {
-            "source": {
-                "branch": "main",
-                "path": "/"
-            }
-        }
-        resp = requests.post(api_url, headers=headers, json=payload)
-        if resp.status_code in (201, 204):
-            print(f"GitHub Pages enabled at {pages_url}")
-        else:
-            print(f"Could not enable GitHub Pages: {resp.status_code}, {resp.text}")
+        repo = await open_repo(task_name)
 
-        return repo.html_url, commit_sha, pages_url
+        # Push all files as one commit
+        commit_sha, _ = await commit_files(task_name, code_files, f"Add app files for {task_name}", attachments)
 
-    except GithubException as e:
-        print(f"GitHub error: {e}")
+        # Enable GitHub Pages (already on for existing and pre-warmed repos)
+        pages_url = await ensure_pages(task_name, repo)
+
+        return repo["html_url"], commit_sha, pages_url
+
+    except GitHubError as e:
+        logger.error(f"GitHub error: {e}")
         raise e
+
+
+async def push_stream_to_github(
+    task_name: str,
+    files: AsyncIterator[Tuple[str, str]],
+    attachments: Optional[List[Attachment]] = None,
+    open_repo: Callable[[str], Awaitable[dict]] = get_or_create_repo
+) -> Tuple[str, str, str, Dict[str, str]]:
+    """
+    Push files to GitHub while they are still being generated.
+
+    Repo creation, Pages enablement and reading the current head start right
+    away and run while `files` is still being generated; a single commit is
+    made once the stream ends. Generated files are text of bounded size, so
+    their content goes inline in the tree (as in commit_files) instead of
+    costing one POST git/blobs each; only attachments, which may be binary
+    or large, are uploaded as blobs, as soon as the head is known.
+
+    Args:
+        task_name: Unique task identifier (used for repo name)
+        files: async iterator of (filename, content) pairs
+        attachments: stored request attachments to commit with the code
+        open_repo: returns the task's repo, creating it if needed (e.g. repo_pool.get_or_claim_repo)
+
+    Returns:
+        repo_url: str
+        commit_sha: str
+        pages_url: str
+        code_files: dict of every filename -> content received
+    """
+
+    async def load_head():
+        await repo_task
+        try:
+            return await get_head(task_name)
+        except GitHubError as e:
+            if e.status in (404, 409):
+                # Empty repo: files are committed through commit_files instead
+                return None
+            raise
+
+    async def enable_pages_when_ready():
+        return await ensure_pages(task_name, await repo_task)
+
+    async def upload_attachments() -> List[dict]:
+        head = await head_task
+        if head is None:
+            return []
+        changes = {"added": [], "modified": [], "unchanged": []}
+        return await attachment_elements(task_name, attachments, head[2], changes)
+
+    attachments = attachments or []
+    attachment_names = {a.name for a in attachments}
+    repo_task = asyncio.create_task(open_repo(task_name))
+    head_task = asyncio.create_task(load_head())
+    pages_task = asyncio.create_task(enable_pages_when_ready())
+    attachments_task = asyncio.create_task(upload_attachments())
+    code_files: Dict[str, str] = {}
+    tasks = [repo_task, head_task, pages_task, attachments_task]
+
+    try:
+        async for filename, content in files:
+            code_files[filename] = content
+
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    repo = repo_task.result()
+    head = head_task.result()
+    message = f"Add app files for {task_name}"
+
+    if head is None:
+        commit_sha, _ = await commit_files(task_name, code_files, message, attachments)
+    else:
+        head_sha, base_tree_sha, existing = head
+        elements = [
+            {"path": filename, "mode": "100644", "type": "blob", "content": content}
+            for filename, content in code_files.items()
+            if filename not in attachment_names and existing.get(filename) != git_blob_sha(content)
+        ]
+        elements += attachments_task.result()
+        if elements:
+            commit_sha = await commit_tree(task_name, head_sha, base_tree_sha, elements, message)
+        else:
+            logger.info(f"No changes to commit in {GITHUB_USER}/{task_name}")
+            commit_sha = head_sha
+
+    return repo["html_url"], commit_sha, pages_task.result(), code_files
@@ -0,0 +1,111 @@
+# api/services/idempotency.py
+
+import hashlib
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from api.services.job_queue import Job
+from api.services.state_store import StateStore, state_store
+
+load_dotenv()
+
+# Seconds a request stays deduplicated after it was first accepted
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Maximum number of requests remembered; the oldest are evicted first
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+
+def idempotency_key(email: str, task: str, round_number: int, nonce: str) -> str:
+    """Identity of an instructor request: the same tuple means the same request."""
+    return hashlib.sha256(f"{email}\0{task}\0{round_number}\0{nonce}".encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded, TTL-evicted map from request key to the nonce of the job that
+    handles it, kept in the shared state store so that a retry is recognised
+    whichever worker process it lands on.
+
+    A retried POST looks its key up here before enqueueing anything: if the
+    original job is still queued or running the retry is attached to it, and
+    if it already finished its stored result is returned as is. Failed jobs
+    are forgotten so that a retry gets a fresh attempt.
+    """
+
+    def __init__(
+        self,
+        ttl: int = IDEMPOTENCY_TTL,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+        store: StateStore = state_store
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self.store.register_schema(
+            """
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY,
+                nonce TEXT,
+                created_at REAL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency (created_at)",
+        )
+        self.duplicates = 0
+
+    def submit_once(
+        self,
+        key: str,
+        submit: Callable[[], Job],
+        lookup: Callable[[str], Optional[Job]]
+    ) -> Tuple[Job, bool]:
+        """
+        Return the job already handling key, or call submit() to start one.
+
+        The lookup and the insert run in one write transaction, so two
+        processes receiving the same request at once cannot both submit it.
+
+        Args:
+            key: idempotency_key() of the request
+            submit: enqueues the job; may raise QueueFullError, which leaves nothing recorded
+            lookup: finds a job by nonce
+
+        Returns:
+            (job, duplicate) where duplicate is True if the job already existed
+        """
+        with self.store.transaction() as conn:
+            self._evict(conn)
+            row = conn.execute("SELECT nonce FROM idempotency WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                job = lookup(row[0])
+                if job is not None and job.status != "failed":
+                    self.duplicates += 1
+                    return job, True
+            job = submit()
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, nonce, created_at) VALUES (?, ?, ?)",
+                (key, job.nonce, time.time()),
+            )
+            return job, False
+
+    def stats(self) -> dict:
+        entries = self.store.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+        return {"entries": entries, "duplicates": self.duplicates}
+
+    def _evict(self, conn) -> None:
+        conn.execute("DELETE FROM idempotency WHERE created_at < ?", (time.time() - self.ttl,))
+        conn.execute(
+            """
+            DELETE FROM idempotency WHERE key IN (
+                SELECT key FROM idempotency ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            # Leave room for the entry about to be inserted
+            (max(0, self.max_entries - 1),),
+        )
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,322 @@
+# api/services/job_queue.py
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from api.services.metrics import JOB_QUEUE_SECONDS, JOB_SECONDS, trace_id
+from api.services.state_store import StateStore, pid_alive, state_store
+
+logger = logging.getLogger("app2app.jobs")
+
+load_dotenv()
+
+# Number of build/revise jobs allowed to run at the same time (per worker process)
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+# Maximum number of jobs waiting for a free worker before POST / is rejected
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "1000"))
+# Number of finished jobs kept around for GET /jobs/{nonce} (across all worker processes)
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "5000"))
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class NonceConflictError(Exception):
+    """Raised when a nonce is reused by a request with a different email, task or round."""
+
+
+class Job:
+    """
+    A single build/revise job and its lifecycle state.
+    """
+
+    def __init__(self, nonce: str, func: Callable, payload: Any, key: Optional[str] = None):
+        self.nonce = nonce
+        self.func = func
+        self.payload = payload
+        self.key = key
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        """Rebuild a job from its row in the shared store (it may belong to another process)."""
+        nonce, task, round_number, status, result, error, created_at, started_at, finished_at = row
+        job = cls(nonce, None, SimpleNamespace(task=task, round=round_number))
+        job.status = status
+        job.result = json.loads(result) if result else None
+        job.error = error
+        job.created_at = created_at
+        job.started_at = started_at
+        job.finished_at = finished_at
+        if finished_at is not None:
+            job.done.set()
+        return job
+
+    def to_dict(self) -> dict:
+        return {
+            "nonce": self.nonce,
+            "task": getattr(self.payload, "task", None),
+            "round": getattr(self.payload, "round", None),
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Accept-then-process queue for build/revise requests.
+
+    Jobs are enqueued by the request handler and executed by a fixed pool of
+    asyncio workers. Coroutine handlers are awaited directly; blocking handlers
+    are offloaded to a thread so the event loop stays responsive.
+
+    A job runs in the worker process that accepted it, but its state is
+    written through to the shared SQLite store, so GET /jobs/{nonce} and the
+    stats work from any process. Jobs still queued or running when the
+    process stops are marked failed, and so are jobs left behind by a
+    process that died, on the next start; a retried request then gets a
+    fresh job instead of attaching to one that will never run.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = MAX_CONCURRENT_JOBS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        max_finished: int = MAX_FINISHED_JOBS,
+        store: StateStore = state_store
+    ):
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        # Jobs queued or running in this process
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.store = store
+        self.store.register_schema(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                nonce TEXT PRIMARY KEY,
+                task TEXT,
+                round INTEGER,
+                status TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                pid INTEGER,
+                request_key TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)",
+            "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)",
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    async def start(self) -> None:
+        """Start the worker pool. Must be called from the running event loop."""
+        self._migrate()
+        self._recover()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"Job queue started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """Cancel all workers. Jobs still queued or running are marked failed."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in list(self.jobs.values()):
+            self._abandon(job, "Worker process stopped before the job started")
+        self.jobs.clear()
+
+    def submit(self, nonce: str, func: Callable, payload: Any, key: Optional[str] = None) -> Job:
+        """
+        Register a job and put it on the queue.
+
+        Args:
+            nonce: unique nonce from the request, used as the job id
+            func: handler to run, sync or async, called as func(payload)
+            payload: request payload passed to the handler
+            key: idempotency key of the request; a nonce already used by a
+                request with a different key is rejected
+
+        Returns:
+            The queued Job.
+
+        Raises:
+            QueueFullError: if the queue is at capacity
+            NonceConflictError: if the nonce belongs to a different request
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+
+        # Jobs are keyed by nonce: replacing another request's job would leave
+        # that request's idempotency entry pointing at this one
+        row = self.store.execute("SELECT request_key FROM jobs WHERE nonce = ?", (nonce,)).fetchone()
+        if row is not None and row[0] is not None and row[0] != key:
+            raise NonceConflictError(f"Nonce {nonce} was already used by a different request")
+
+        job = Job(nonce, func, payload, key)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+
+        self.jobs[nonce] = job
+        self.jobs.move_to_end(nonce)
+        self._save(job)
+        self._prune()
+        return job
+
+    def get(self, nonce: str) -> Optional[Job]:
+        job = self.jobs.get(nonce)
+        if job is not None:
+            return job
+        row = self.store.execute(
+            """
+            SELECT nonce, task, round, status, result, error, created_at, started_at, finished_at
+            FROM jobs WHERE nonce = ?
+            """,
+            (nonce,),
+        ).fetchone()
+        return Job.from_row(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+        for status, total in self.store.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = total
+        counts["workers"] = self.concurrency
+        return counts
+
+    def _save(self, job: Job) -> None:
+        self.store.execute(
+            """
+            INSERT OR REPLACE INTO jobs
+                (nonce, task, round, status, result, error, created_at, started_at, finished_at, pid, request_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                job.nonce,
+                getattr(job.payload, "task", None),
+                getattr(job.payload, "round", None),
+                job.status,
+                json.dumps(job.result) if job.result is not None else None,
+                job.error,
+                job.created_at,
+                job.started_at,
+                job.finished_at,
+                os.getpid(),
+                job.key,
+            ),
+        )
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs once the retention limit is exceeded."""
+        self.store.execute(
+            """
+            DELETE FROM jobs WHERE nonce IN (
+                SELECT nonce FROM jobs WHERE finished_at IS NOT NULL
+                ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_finished,),
+        )
+
+    def _migrate(self) -> None:
+        """Add the request key column to job tables created before it existed."""
+        with self.store.transaction() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "request_key" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN request_key TEXT")
+
+    def _abandon(self, job: Job, error: str) -> None:
+        job.status = "failed"
+        job.error = error
+        job.finished_at = time.time()
+        self._save(job)
+        job.done.set()
+
+    def _recover(self) -> None:
+        """Fail jobs that a dead worker process left queued or running."""
+        with self.store.transaction() as conn:
+            pids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT pid FROM jobs WHERE status IN ('queued', 'running')"
+            )]
+            # A restarted process may reuse its old pid (PID 1 in a container),
+            # and nothing has run in this process yet, so its own rows are stale too
+            dead = [pid for pid in pids if pid == os.getpid() or not pid_alive(pid)]
+            conn.executemany(
+                """
+                UPDATE jobs SET status = 'failed', error = 'Worker process exited before the job finished',
+                    finished_at = ?
+                WHERE pid = ? AND status IN ('queued', 'running')
+                """,
+                [(time.time(), pid) for pid in dead],
+            )
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            trace_id.set(job.nonce)
+            JOB_QUEUE_SECONDS.observe(job.started_at - job.created_at)
+            try:
+                self._save(job)
+                if inspect.iscoroutinefunction(job.func):
+                    job.result = await job.func(job.payload)
+                else:
+                    job.result = await asyncio.to_thread(job.func, job.payload)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                job.error = "Worker process stopped before the job finished"
+                job.status = "failed"
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.nonce} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                JOB_SECONDS.labels(str(getattr(job.payload, "round", "")), job.status).observe(
+                    job.finished_at - job.started_at
+                )
+                # A failed write must not kill this worker or leave waiters hanging
+                self._save_final(job)
+                self.jobs.pop(job.nonce, None)
+                job.done.set()
+                self._queue.task_done()
+
+    def _save_final(self, job: Job, attempts: int = 3) -> None:
+        """Write a finished job, retrying a few times (each try already waits out SQLITE_BUSY_TIMEOUT)."""
+        for attempt in range(1, attempts + 1):
+            try:
+                self._save(job)
+                return
+            except Exception as e:
+                logger.error(f"Could not save job {job.nonce} ({job.status}), attempt {attempt}/{attempts}: {e}")
+        # The row is left 'running'; it is marked failed when this process next starts
@@ -0,0 +1,111 @@
+# api/services/json_stream.py
+
+import json
+from typing import List, Tuple
+
+
+class IncrementalFileParser:
+    """
+    Incremental parser for a streamed JSON object of filename -> content.
+
+    Text is fed chunk by chunk as the model produces it; every
+    "filename": "content" pair is returned from feed() as soon as its closing
+    quote arrives, without waiting for the rest of the object. Anything
+    before the first '{' (such as a ```json fence) is skipped. If the object
+    contains something other than string values, the parser marks itself
+    failed and the caller should fall back to parsing the full text.
+    """
+
+    SEEK_OBJECT, SEEK_KEY, KEY, SEEK_COLON, SEEK_VALUE, VALUE, SEEK_COMMA, DONE, FAILED = range(9)
+
+    def __init__(self):
+        self.state = self.SEEK_OBJECT
+        self.key = None
+        self._buf: List[str] = []
+        self._escaped = False
+
+    @property
+    def failed(self) -> bool:
+        return self.state == self.FAILED
+
+    @property
+    def done(self) -> bool:
+        return self.state == self.DONE
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Consume a chunk of text.
+
+        Returns:
+            list of (filename, content) pairs completed by this chunk
+        """
+        completed = []
+        i, n = 0, len(chunk)
+        while i < n and self.state not in (self.DONE, self.FAILED):
+            if self.state in (self.KEY, self.VALUE):
+                i = self._consume_string(chunk, i, completed)
+                continue
+
+            ch = chunk[i]
+            i += 1
+            if ch.isspace():
+                continue
+
+            if self.state == self.SEEK_OBJECT:
+                if ch == "{":
+                    self.state = self.SEEK_KEY
+            elif self.state == self.SEEK_KEY:
+                if ch == '"':
+                    self.state = self.KEY
+                elif ch == "}":
+                    self.state = self.DONE
+                else:
+                    self.state = self.FAILED
+            elif self.state == self.SEEK_COLON:
+                self.state = self.SEEK_VALUE if ch == ":" else self.FAILED
+            elif self.state == self.SEEK_VALUE:
+                self.state = self.VALUE if ch == '"' else self.FAILED
+            elif self.state == self.SEEK_COMMA:
+                if ch == ",":
+                    self.state = self.SEEK_KEY
+                elif ch == "}":
+                    self.state = self.DONE
+                else:
+                    self.state = self.FAILED
+        return completed
+
+    def _consume_string(self, chunk: str, i: int, completed: List[Tuple[str, str]]) -> int:
+        """Read string characters from chunk[i:] until the closing quote or end of chunk."""
+        start = i
+        n = len(chunk)
+        while i < n:
+            ch = chunk[i]
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._buf.append(chunk[start:i])
+                self._finish_string(completed)
+                return i + 1
+            i += 1
+        self._buf.append(chunk[start:])
+        return n
+
+    def _finish_string(self, completed: List[Tuple[str, str]]) -> None:
+        raw = "".join(self._buf)
+        self._buf = []
+        try:
+            # strict=False tolerates raw newlines/tabs models sometimes emit
+            text = json.loads(f'"{raw}"', strict=False)
+        except ValueError:
+            self.state = self.FAILED
+            return
+
+        if self.state == self.KEY:
+            self.key = text
+            self.state = self.SEEK_COLON
+        else:
+            completed.append((self.key, text))
+            self.key = None
+            self.state = self.SEEK_COMMA
@@ -0,0 +1,136 @@
+# api/services/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from api.services.metrics import count
+from api.services.state_store import connect
+
+load_dotenv()
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "results/llm_cache.db")
+# Seconds a cached generation stays valid (0 disables expiry)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Maximum number of cached generations; least recently used ones are evicted
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+# Set to 1 to always call the model and never read or write the cache
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0").lower() in ("1", "true", "yes")
+
+
+class GenerationCache:
+    """
+    Persistent, content-addressed cache of LLM generations backed by SQLite.
+
+    Entries are keyed by a hash of everything that determines the output
+    (model, prompt template version, brief, attachments), expire after a TTL
+    and are evicted least-recently-used first once the cache is full.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: int = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # WAL and a busy timeout so every worker process can share the cache file
+            self._conn = connect(self.path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    created_at REAL,
+                    last_used_at REAL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generations_last_used ON generations (last_used_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, brief: str, attachments: Any = None) -> str:
+        """Hash the generation inputs into a stable cache key."""
+        material = json.dumps(
+            {
+                "model": model,
+                "prompt_version": prompt_version,
+                "brief": brief,
+                "attachments": attachments or [],
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Return the cached generation for key, or None on a miss or expiry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM generations WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                count("llm_cache_miss")
+                return None
+
+            conn.execute("UPDATE generations SET last_used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            count("llm_cache_hit")
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, str]) -> None:
+        """Store a generation and evict the least recently used entries beyond the limit."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (key, value, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False, separators=(",", ":")), now, now),
+            )
+            if self.ttl:
+                conn.execute("DELETE FROM generations WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                """
+                DELETE FROM generations WHERE key IN (
+                    SELECT key FROM generations ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+generation_cache = GenerationCache()
@@ -1,67 +1,323 @@
 # api/services/llm_generator.py
 
-import os
+import asyncio
+import contextvars
 import json
+import logging
+import os
+import threading
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 # import google.generativeai as genai
 from dotenv import load_dotenv
-from google import genai
+
+from api.services.attachments import Attachment
+from api.services.json_stream import IncrementalFileParser
+from api.services.llm_cache import generation_cache, LLM_CACHE_BYPASS
+from api.services.llm_providers import llm_router
+from api.services.metrics import count, span
+from api.services.patching import PatchError, apply_revision
+
+logger = logging.getLogger("app2app.llm")
 
 # Load .env
 load_dotenv()
 
-# Configure Gemini
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-# Initialize the Gemini client
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# Bump whenever the prompt below changes so cached generations are not reused
+PROMPT_VERSION = "2"
+REVISE_PROMPT_VERSION = "1"
 
 
-def generate_app_code(brief: str) -> dict:
-    """
-    Generate minimal web app files using Gemini.
-    """
+# Set to 0 to wait for the full response instead of streaming files as they complete
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1").lower() in ("1", "true", "yes")
+
+FALLBACK_FILES = {
+    "index.html": "<!DOCTYPE html><html><head><title>Fallback App</title></head><body><h1>Fallback App</h1></body></html>",
+    "README.md": "# Fallback App\nThis is a fallback README generated due to LLM error."
+}
+
 
-    prompt = f"""
+def describe_attachments(attachments: Optional[List[Attachment]]) -> str:
+    """Prompt section listing the attachments, with a preview of text ones."""
+    if not attachments:
+        return ""
+    lines = ["", "Attachments (committed next to index.html, reference them by file name):"]
+    for attachment in attachments:
+        lines.append(f"- {attachment.name} ({attachment.mime_type}, {attachment.size} bytes)")
+        preview = attachment.preview()
+        if preview:
+            lines.append(f"  First {len(preview)} characters:")
+            lines.append("  " + preview.replace("\n", "\n  "))
+    return "\n".join(lines) + "\n"
+
+
+def build_prompt(brief: str, attachments: Optional[List[Attachment]] = None) -> str:
+    return f"""
 You are an assistant that generates a minimal, functional HTML/CSS/JS web app
 based on the following brief. Return the output as a JSON object with filenames
 as keys and file contents as values.
 
 Brief:
 {brief}
-
+{describe_attachments(attachments)}
 Requirements:
 - index.html must exist
 - Include main.js and style.css if needed
 - Include a README.md with: summary, setup, usage, and license
 - Output as a JSON object where keys are filenames and values are contents
 - Keep code minimal and functional
+- Do not output the attachment files themselves
+"""
+
+
+def build_revise_prompt(
+    brief: str,
+    current_files: Dict[str, str],
+    attachments: Optional[List[Attachment]] = None,
+    other_files: Iterable[str] = ()
+) -> str:
+    other = ", ".join(sorted(other_files)) or "none"
+    return f"""
+You are an assistant that updates an existing minimal HTML/CSS/JS web app
+to satisfy a new brief. Change only what the brief requires.
+
+New brief:
+{brief}
+{describe_attachments(attachments)}
+Other files in the repo (not shown, do not modify): {other}
+
+Current files, as a JSON object with filenames as keys and contents as values:
+{json.dumps(current_files, indent=1, ensure_ascii=False)}
+
+Return a JSON object with two keys:
+- "patches": filename -> unified diff (with @@ hunk headers and 3 lines of context)
+  against the current content, for small edits to existing files
+- "files": filename -> full content, only for new files or files rewritten almost entirely
+Leave out files that do not change. Keep index.html and update README.md if the
+app's behavior changes.
 """
 
+
+def parse_code_files(content: str) -> dict:
+    """
+    Extract the filename -> content JSON object from a model response.
+
+    Raises:
+        ValueError: if no JSON object can be decoded
+    """
+    content = content.strip()
+
+    # Attempt to extract JSON safely
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
+        start = content.index('{')
+        end = content.rindex('}') + 1
+        content = content[start:end]
+    except ValueError:
+        pass
 
-        content = response.text.strip()
+    return json.loads(content)
 
-        # Attempt to extract JSON safely
-        try:
-            start = content.index('{')
-            end = content.rindex('}') + 1
-            content = content[start:end]
-        except ValueError:
-            pass
 
-        code_files = json.loads(content)
+def generate_app_code(brief: str, attachments: Optional[List[Attachment]] = None, use_cache: bool = True) -> dict:
+    """
+    Generate minimal web app files using the configured LLM providers.
+
+    Successful generations are cached by (model, prompt version, brief,
+    attachments); pass use_cache=False (or set LLM_CACHE_BYPASS=1) to always
+    call the model.
+    """
+
+    use_cache = use_cache and not LLM_CACHE_BYPASS
+    cache_key = generation_cache.make_key(
+        llm_router.namespace, PROMPT_VERSION, brief, [a.to_dict() for a in attachments or []]
+    )
+    if use_cache:
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached generation {cache_key[:12]}")
+            return cached
+
+    try:
+        with span("llm_generate"):
+            text = llm_router.generate(build_prompt(brief, attachments))
+
+        code_files = parse_code_files(text)
+        if use_cache:
+            generation_cache.set(cache_key, code_files)
         return code_files
 
     except Exception as e:
-        print(f"Error generating app code with Gemini: {e}")
+        logger.error(f"Error generating app code: {e}")
+        count("llm_fallback")
         # Fallback minimal HTML
-        return {
-            "index.html": "<!DOCTYPE html><html><head><title>Fallback App</title></head><body><h1>Fallback App</h1></body></html>",
-            "README.md": "# Fallback App\nThis is a fallback README generated due to LLM error."
+        return dict(FALLBACK_FILES)
+
+
+def generate_revision(
+    brief: str,
+    current_files: Dict[str, str],
+    attachments: Optional[List[Attachment]] = None,
+    other_files: Iterable[str] = (),
+    use_cache: bool = True
+) -> Dict[str, str]:
+    """
+    Ask the model for only the changes a new brief needs, as diffs or
+    rewritten files, and apply them to current_files.
+
+    Unlike generate_app_code there is no fallback app: the caller regenerates
+    everything instead when this raises.
+
+    Args:
+        brief: new brief
+        current_files: path -> content of the text files on main
+        attachments: stored request attachments
+        other_files: paths on main that are not sent (binary, too large, attachments)
+        use_cache: reuse a cached revision of the same files for the same brief
+
+    Returns:
+        path -> new content, for the changed and added files only
+
+    Raises:
+        PatchError: if the response is malformed or the changes do not apply
+    """
+    use_cache = use_cache and not LLM_CACHE_BYPASS
+    other_files = sorted(other_files)
+    cache_key = generation_cache.make_key(
+        llm_router.namespace, f"revise-{REVISE_PROMPT_VERSION}", brief, {
+            "attachments": [a.to_dict() for a in attachments or []],
+            "files": current_files,
+            "other_files": other_files,
         }
+    )
+    if use_cache:
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached revision {cache_key[:12]}")
+            return cached
+
+    with span("llm_revise"):
+        text = llm_router.generate(build_revise_prompt(brief, current_files, attachments, other_files))
+
+    try:
+        response = parse_code_files(text)
+    except ValueError as e:
+        raise PatchError(f"Could not parse revision: {e}")
+    if not isinstance(response, dict):
+        raise PatchError("Revision is not a JSON object")
+    changed = apply_revision(
+        current_files,
+        response.get("files") or {},
+        response.get("patches") or {},
+        protected=[*other_files, *(a.name for a in attachments or [])]
+    )
+    if use_cache:
+        generation_cache.set(cache_key, changed)
+    return changed
+
+
+def generate_app_code_stream(
+    brief: str,
+    attachments: Optional[List[Attachment]] = None,
+    use_cache: bool = True,
+    stop: Optional[threading.Event] = None
+) -> Iterator[Tuple[str, str]]:
+    """
+    Generate app files with a streaming LLM request, yielding each
+    (filename, content) pair as soon as it is complete in the stream.
+
+    The full text is still parsed at the end as a safety net, so files the
+    incremental parser could not extract are yielded then. Caching and the
+    fallback app behave as in generate_app_code; the fallback is also
+    yielded if the stream fails after some files were emitted but before
+    index.html, so a partial app is never deployed without one.
+
+    If stop is set, the LLM stream is abandoned at the next chunk and
+    nothing more is yielded or cached.
+    """
+
+    use_cache = use_cache and not LLM_CACHE_BYPASS
+    cache_key = generation_cache.make_key(
+        llm_router.namespace, PROMPT_VERSION, brief, [a.to_dict() for a in attachments or []]
+    )
+    if use_cache:
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached generation {cache_key[:12]}")
+            yield from cached.items()
+            return
+
+    parser = IncrementalFileParser()
+    chunks = []
+    emitted = {}
+    try:
+        with span("llm_stream"):
+            for text in llm_router.stream(build_prompt(brief, attachments)):
+                if stop is not None and stop.is_set():
+                    logger.info("Consumer went away; abandoning the LLM stream")
+                    return
+                chunks.append(text)
+                for filename, content in parser.feed(text):
+                    emitted[filename] = content
+                    yield filename, content
+
+        if not parser.done:
+            # Incremental parsing gave up or the object was cut short: parse the whole text
+            for filename, content in parse_code_files("".join(chunks)).items():
+                if emitted.get(filename) != content:
+                    emitted[filename] = content
+                    yield filename, content
+
+    except Exception as e:
+        logger.error(f"Error generating app code: {e}")
+    else:
+        if use_cache and emitted.get("index.html", "").strip():
+            generation_cache.set(cache_key, emitted)
+
+    if not emitted.get("index.html", "").strip():
+        # Nothing usable, or the stream broke off before index.html: never deploy an app without one
+        if emitted:
+            logger.warning(f"Generation ended without index.html (got {sorted(emitted)}); using the fallback app")
+        count("llm_fallback")
+        # Fallback minimal HTML
+        yield from FALLBACK_FILES.items()
+
+
+async def stream_app_code(
+    brief: str,
+    attachments: Optional[List[Attachment]] = None,
+    use_cache: bool = True
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Async wrapper around generate_app_code_stream: the blocking stream is
+    consumed in a worker thread and files are handed to the event loop as
+    they complete. If the consumer stops early (an upload failed, the job
+    was cancelled), the producer is told to stop and is awaited, so the
+    thread does not keep reading the LLM stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in generate_app_code_stream(brief, attachments, use_cache, stop):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    # Copy the context so the producer thread logs under the task's trace ID
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        await producer
 
 
 def generate_test_app_code(brief: str):
@@ -0,0 +1,353 @@
+# api/services/llm_providers.py
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from api.services.metrics import LLM_REQUEST_SECONDS, count
+
+logger = logging.getLogger("app2app.llm")
+
+load_dotenv()
+
+# Gemini
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Optional override of the Gemini endpoint (e.g. a local stand-in for benchmarks)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+# Any OpenAI-compatible chat completions API
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# Providers to use, in order of preference while there is no latency data yet
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "gemini,openai").split(",") if p.strip()]
+# Send a second (hedged) request once the first is slower than the provider's p90
+LLM_HEDGING = os.getenv("LLM_HEDGING", "1").lower() in ("1", "true", "yes")
+# Hedge delay in seconds used until a provider has LLM_HEDGE_MIN_SAMPLES latency samples
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "15"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "10"))
+# Consecutive failures after which a provider is skipped for LLM_PROVIDER_COOLDOWN seconds
+LLM_PROVIDER_MAX_FAILURES = int(os.getenv("LLM_PROVIDER_MAX_FAILURES", "3"))
+LLM_PROVIDER_COOLDOWN = float(os.getenv("LLM_PROVIDER_COOLDOWN", "60"))
+# Latency samples kept per provider
+LLM_LATENCY_WINDOW = 100
+
+
+def _percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LLMProvider:
+    """
+    One text-generation backend.
+
+    Subclasses implement generate() and stream(); the base class keeps the
+    latency samples and health state the router uses, and bounds how many
+    requests run against the backend at once.
+    """
+
+    name = "provider"
+
+    def __init__(self, model: str, max_concurrency: int):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.active = 0
+        # "generate": full response latency, "stream": time to the first chunk
+        self.latencies: Dict[str, Deque[float]] = {
+            "generate": deque(maxlen=LLM_LATENCY_WINDOW),
+            "stream": deque(maxlen=LLM_LATENCY_WINDOW),
+        }
+        self.failures = 0
+        self.unhealthy_until = 0.0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        raise NotImplementedError
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.unhealthy_until
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.max_concurrency
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the provider's concurrency slots."""
+        with self.slots:
+            with self._lock:
+                self.active += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def latency(self, kind: str, pct: float) -> Optional[float]:
+        with self._lock:
+            return _percentile(self.latencies[kind], pct)
+
+    def hedge_delay(self, kind: str) -> float:
+        with self._lock:
+            samples = list(self.latencies[kind])
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DELAY
+        return _percentile(samples, 90)
+
+    def record_success(self, kind: str, seconds: float) -> None:
+        LLM_REQUEST_SECONDS.labels(self.name, kind, "ok").observe(seconds)
+        with self._lock:
+            self.latencies[kind].append(seconds)
+            self.failures = 0
+
+    def record_failure(self, kind: str, seconds: float) -> None:
+        LLM_REQUEST_SECONDS.labels(self.name, kind, "error").observe(seconds)
+        count("llm_provider_error")
+        with self._lock:
+            self.failures += 1
+            if self.failures >= LLM_PROVIDER_MAX_FAILURES:
+                self.unhealthy_until = time.time() + LLM_PROVIDER_COOLDOWN
+                logger.warning(f"LLM provider {self.name} marked unhealthy for {LLM_PROVIDER_COOLDOWN:.0f}s")
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "active": self.active,
+            "p50": self.latency("generate", 50),
+            "p90": self.latency("generate", 90),
+            "first_chunk_p50": self.latency("stream", 50),
+            "first_chunk_p90": self.latency("stream", 90),
+        }
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(
+        self,
+        api_key: str = GOOGLE_API_KEY,
+        model: str = GEMINI_MODEL,
+        base_url: Optional[str] = GEMINI_BASE_URL,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY
+    ):
+        from google import genai
+
+        super().__init__(model, max_concurrency)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options={"base_url": base_url} if base_url else None
+        )
+
+    def generate(self, prompt: str) -> str:
+        return self.client.models.generate_content(model=self.model, contents=prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt):
+            yield chunk.text or ""
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: str = OPENAI_API_KEY,
+        model: str = OPENAI_MODEL,
+        base_url: Optional[str] = OPENAI_BASE_URL,
+        max_concurrency: int = OPENAI_MAX_CONCURRENCY
+    ):
+        from openai import OpenAI
+
+        super().__init__(model, max_concurrency)
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+
+    def _messages(self, prompt: str) -> List[dict]:
+        return [{"role": "user", "content": prompt}]
+
+    def generate(self, prompt: str) -> str:
+        response = self.client.chat.completions.create(model=self.model, messages=self._messages(prompt))
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        response = self.client.chat.completions.create(
+            model=self.model, messages=self._messages(prompt), stream=True
+        )
+        try:
+            for chunk in response:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            response.close()
+
+
+class ProviderRouter:
+    """
+    Routes generation requests across providers.
+
+    Healthy providers are tried fastest first (by median latency; providers
+    without samples yet keep their configured order, and providers whose
+    last request failed go last). If the first attempt
+    has not produced anything after the provider's p90 latency, a hedged
+    request is sent to the next provider (or the same one if it is the only
+    one) and whichever answers first wins. A failed attempt falls over to the
+    next provider. For streams the race is on the first chunk; the losing
+    stream is closed as soon as it notices it lost.
+    """
+
+    def __init__(self, providers: List[LLMProvider], hedging: bool = LLM_HEDGING):
+        self.providers = providers
+        self.hedging = hedging
+        workers = sum(p.max_concurrency for p in providers) * 2 or 1
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+
+    @property
+    def namespace(self) -> str:
+        """Identifies the provider set, for cache keys."""
+        return ",".join(f"{p.name}:{p.model}" for p in self.providers)
+
+    def ranked(self, kind: str) -> List[LLMProvider]:
+        healthy = [p for p in self.providers if p.healthy] or list(self.providers)
+        order = {p: i for i, p in enumerate(healthy)}
+
+        def sort_key(p):
+            median = p.latency(kind, 50)
+            return (p.failures > 0, median is not None, median or 0.0, order[p])
+
+        return sorted(healthy, key=sort_key)
+
+    def stats(self) -> Dict[str, dict]:
+        return {p.name: p.stats() for p in self.providers}
+
+    def generate(self, prompt: str) -> str:
+        """Return the full response text of the first provider to answer."""
+        return "".join(self._race("generate", lambda p: iter([p.generate(prompt)])))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield response chunks from the first provider to start answering."""
+        return self._race("stream", lambda p: p.stream(prompt))
+
+    def _race(self, kind: str, call: Callable[[LLMProvider], Iterator[str]]) -> Iterator[str]:
+        if not self.providers:
+            raise RuntimeError("No LLM provider configured (set GOOGLE_API_KEY or OPENAI_API_KEY)")
+
+        candidates = self.ranked(kind)
+        events: "queue.Queue" = queue.Queue()
+        done = object()
+        launched: List[LLMProvider] = []
+        pending = set()
+        hedges = set()
+        # Index of the attempt whose output is used; -1 once the caller is gone
+        winner: List[Optional[int]] = [None]
+
+        def run(attempt: int, provider: LLMProvider) -> None:
+            with provider.slot():
+                start = time.perf_counter()
+                first = True
+                try:
+                    for chunk in call(provider):
+                        if first:
+                            provider.record_success(kind, time.perf_counter() - start)
+                            first = False
+                        if winner[0] not in (None, attempt):
+                            return
+                        events.put((attempt, chunk, None))
+                    events.put((attempt, done, None))
+                except Exception as e:
+                    if first:
+                        provider.record_failure(kind, time.perf_counter() - start)
+                    events.put((attempt, None, e))
+
+        def launch(provider: LLMProvider) -> int:
+            attempt = len(launched)
+            launched.append(provider)
+            pending.add(attempt)
+            self._executor.submit(run, attempt, provider)
+            return attempt
+
+        launch(candidates[0])
+        hedge_at = time.monotonic() + candidates[0].hedge_delay(kind) if self.hedging else None
+
+        try:
+            while True:
+                timeout = None
+                if winner[0] is None and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    attempt, chunk, error = events.get(timeout=timeout)
+                except queue.Empty:
+                    # The first attempt is slow: hedge on the next provider with a free slot
+                    hedge_at = None
+                    hedge = next((p for p in candidates[1:] + candidates[:1] if not p.saturated), None)
+                    if hedge is not None:
+                        logger.info(f"LLM request slow; hedging on {hedge.name}")
+                        count("llm_hedge")
+                        hedges.add(launch(hedge))
+                    continue
+
+                if winner[0] is not None and attempt != winner[0]:
+                    continue
+
+                if error is not None:
+                    pending.discard(attempt)
+                    logger.warning(f"LLM provider {launched[attempt].name} failed: {error}")
+                    if winner[0] is not None:
+                        raise error
+                    untried = [p for p in candidates if p not in launched]
+                    if untried:
+                        launch(untried[0])
+                    elif not pending:
+                        raise error
+                    continue
+
+                if winner[0] is None:
+                    winner[0] = attempt
+                    if attempt in hedges:
+                        count("llm_hedge_won")
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            # Make the attempts still running stop as soon as they produce output
+            winner[0] = -1
+
+
+def build_providers() -> List[LLMProvider]:
+    """Instantiate every provider listed in LLM_PROVIDERS that has credentials."""
+    factories = {
+        "gemini": (GOOGLE_API_KEY, GeminiProvider),
+        "openai": (OPENAI_API_KEY, OpenAIProvider),
+    }
+    providers = []
+    for name in LLM_PROVIDERS:
+        if name not in factories:
+            logger.warning(f"Unknown LLM provider '{name}' ignored")
+            continue
+        key, factory = factories[name]
+        if key:
+            providers.append(factory())
+    return providers
+
+
+llm_router = ProviderRouter(build_providers())
@@ -0,0 +1,135 @@
+# api/services/metrics.py
+
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# With several worker processes, each one writes its samples to files in this
+# directory and /metrics aggregates them (must be set before the app starts)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Trace ID of the task being processed (its nonce), attached to every log line
+trace_id: contextvars.ContextVar = contextvars.ContextVar("trace_id", default="-")
+
+_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "app2app_stage_seconds",
+    "Duration of pipeline stages (LLM generation, commit, Pages, notification, ...)",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+GITHUB_REQUEST_SECONDS = Histogram(
+    "app2app_github_request_seconds",
+    "Duration of individual GitHub API requests",
+    ["method", "endpoint", "status"],
+    buckets=_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "app2app_llm_request_seconds",
+    "LLM request latency (full response, or first chunk for streams) by provider",
+    ["provider", "kind", "outcome"],
+    buckets=_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "app2app_job_seconds",
+    "Time from a job starting to finishing",
+    ["round", "status"],
+    buckets=_BUCKETS,
+)
+JOB_QUEUE_SECONDS = Histogram(
+    "app2app_job_queue_seconds",
+    "Time jobs spend queued before a worker picks them up",
+    buckets=_BUCKETS,
+)
+EVENTS = Counter(
+    "app2app_events_total",
+    "Pipeline events such as retries, fallbacks and cache hits",
+    ["event"],
+)
+# Jobs, notifications and cache entries are read from shared storage, so any
+# process's latest value is the total; the GitHub budget is per process
+JOBS = Gauge("app2app_jobs", "Jobs currently tracked, by status", ["status"], multiprocess_mode="mostrecent")
+GITHUB_BUDGET = Gauge(
+    "app2app_github_budget", "GitHub rate-limit scheduler state", ["field"], multiprocess_mode="liveall"
+)
+NOTIFICATIONS = Gauge(
+    "app2app_notifications", "Outbox notifications, by status", ["status"], multiprocess_mode="mostrecent"
+)
+LLM_CACHE_ENTRIES = Gauge(
+    "app2app_llm_cache_entries", "Entries in the LLM generation cache", multiprocess_mode="mostrecent"
+)
+
+logger = logging.getLogger("app2app.metrics")
+
+_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds the current trace ID to every log record."""
+
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def configure_logging(level=logging.INFO) -> None:
+    """Send app2app logs to stderr as `time level [trace_id] logger: message`."""
+    root = logging.getLogger("app2app")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+
+
+def count(event: str, amount: float = 1) -> None:
+    EVENTS.labels(event).inc(amount)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block, record it in app2app_stage_seconds and log its duration."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(duration)
+        logger.debug("%s took %.3fs", stage, duration)
+
+
+def render() -> bytes:
+    """Metrics in the Prometheus text format, aggregated across worker processes when enabled."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead() -> None:
+    """Drop this process's per-process gauges on shutdown in multi-worker mode."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def endpoint_template(path: str) -> str:
+    """
+    Collapse a GitHub API path into a low-cardinality label, e.g.
+    /repos/user/task/git/trees/<sha> -> /repos/{owner}/{repo}/git/trees/{sha}
+    """
+    parts = path.split("?")[0].strip("/").split("/")
+    if parts[0] == "repos" and len(parts) >= 3:
+        parts[1:3] = ["{owner}", "{repo}"]
+        if len(parts) > 3 and parts[3] == "contents":
+            parts[4:] = ["{path}"]
+    return "/" + "/".join("{sha}" if _SHA.match(p) else p for p in parts)
@@ -1,8 +1,318 @@
 # api/services/notifier.py
 
-import requests
-import time
+import asyncio
 import json
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+from api.services.metrics import count, span, trace_id
+from api.services.state_store import StateStore, pid_alive
+
+logger = logging.getLogger("app2app.notifier")
+
+load_dotenv()
+
+NOTIFY_OUTBOX_PATH = os.getenv("NOTIFY_OUTBOX_PATH", "results/outbox.db")
+# Delivery attempts before a notification is marked as failed
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "10"))
+# Backoff: base * 2^attempt seconds, capped, with +/-50% jitter
+NOTIFY_BASE_DELAY = float(os.getenv("NOTIFY_BASE_DELAY", "1"))
+NOTIFY_MAX_DELAY = float(os.getenv("NOTIFY_MAX_DELAY", "300"))
+# Concurrent deliveries allowed towards one evaluation server
+NOTIFY_PER_DESTINATION_CONCURRENCY = int(os.getenv("NOTIFY_PER_DESTINATION_CONCURRENCY", "4"))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "30"))
+# Delivered notifications are deleted after this many seconds
+NOTIFY_RETENTION = int(os.getenv("NOTIFY_RETENTION", str(7 * 24 * 3600)))
+# Longest the dispatcher sleeps before checking for rows queued by other worker processes
+NOTIFY_POLL_INTERVAL = float(os.getenv("NOTIFY_POLL_INTERVAL", "5"))
+
+
+class NotificationOutbox:
+    """
+    Durable outbox for evaluation notifications.
+
+    notify_evaluation() only writes a row to a local SQLite table; a
+    background asyncio dispatcher delivers pending rows over a pooled HTTP
+    client with jittered exponential backoff and a concurrency limit per
+    destination host. Rows left in flight by a crash are replayed on the
+    next start, so a notification is never lost. A notification can also
+    be held (status 'awaiting_pages') until release() or a deadline, so
+    one waiting on GitHub Pages is already durable while it waits.
+
+    Several worker processes can share one outbox file: a row is claimed
+    for delivery inside a write transaction and tagged with the claiming
+    pid, and rows claimed by a process that has since died are released.
+    """
+
+    def __init__(self, path: str = NOTIFY_OUTBOX_PATH):
+        self.path = path
+        self._store = StateStore(path)
+        self._store.register_schema(
+            """
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                evaluation_url TEXT,
+                payload TEXT,
+                status TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL,
+                last_error TEXT,
+                created_at REAL,
+                delivered_at REAL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_notifications_due ON notifications (status, next_attempt_at)",
+        )
+        self._migrated = False
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = set()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _migrate(self) -> None:
+        """Add the claim columns to outboxes created before multi-worker mode."""
+        if self._migrated:
+            return
+        with self._store.transaction() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(notifications)")}
+            if "claimed_by" not in columns:
+                conn.execute("ALTER TABLE notifications ADD COLUMN claimed_by INTEGER")
+            if "claimed_at" not in columns:
+                conn.execute("ALTER TABLE notifications ADD COLUMN claimed_at REAL")
+        self._migrated = True
+
+    def _execute(self, sql: str, params=()):
+        self._migrate()
+        return self._store.execute(sql, params)
+
+    def enqueue(self, evaluation_url: str, payload: dict, hold_until: Optional[float] = None) -> int:
+        """
+        Persist a notification and wake the dispatcher. Safe to call from any thread.
+
+        Args:
+            evaluation_url: URL to POST the payload to
+            payload: JSON body
+            hold_until: if set, hold the notification until release() is
+                called or this time passes, whichever comes first
+
+        Returns:
+            id of the outbox row
+        """
+        now = time.time()
+        if hold_until is None:
+            status, due, claimed_by = "pending", now, None
+        else:
+            status, due, claimed_by = "awaiting_pages", hold_until, os.getpid()
+        cur = self._execute(
+            """
+            INSERT INTO notifications (evaluation_url, payload, status, attempts, next_attempt_at, created_at, claimed_by)
+            VALUES (?, ?, ?, 0, ?, ?, ?)
+            """,
+            (evaluation_url, json.dumps(payload, separators=(",", ":")), status, due, now, claimed_by),
+        )
+        if hold_until is None:
+            self._wake_soon()
+        return cur.lastrowid
+
+    def release(self, row_id: int) -> None:
+        """Queue a held notification for delivery now. Safe to call from any thread."""
+        self._execute(
+            """
+            UPDATE notifications SET status = 'pending', next_attempt_at = ?, claimed_by = NULL
+            WHERE id = ? AND status = 'awaiting_pages'
+            """,
+            (time.time(), row_id),
+        )
+        self._wake_soon()
+
+    def _wake_soon(self) -> None:
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self) -> None:
+        """Replay interrupted deliveries and start the background dispatcher."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=NOTIFY_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        # A restarted process may reuse its old pid, so its own claims are released too
+        replayed = self._execute(
+            """
+            UPDATE notifications SET status = 'pending', claimed_by = NULL, next_attempt_at = MIN(next_attempt_at, ?)
+            WHERE status IN ('delivering', 'awaiting_pages') AND claimed_by = ?
+            """,
+            (time.time(), os.getpid()),
+        ).rowcount + self._release_dead()
+        if replayed:
+            logger.info(f"Replaying {replayed} interrupted notifications")
+        self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._in_flight, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        # Anything cancelled mid-delivery is picked up again by whichever process polls next
+        self._execute(
+            "UPDATE notifications SET status = 'pending', claimed_by = NULL WHERE status = 'delivering' AND claimed_by = ?",
+            (os.getpid(),),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._execute("SELECT status, COUNT(*) FROM notifications GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _release_dead(self) -> int:
+        """
+        Put rows claimed by worker processes that no longer exist back to
+        pending. Held rows whose process died are sent right away: nothing
+        is watching their Pages deployment any more.
+        """
+        with self._store.transaction() as conn:
+            pids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT claimed_by FROM notifications WHERE status IN ('delivering', 'awaiting_pages')"
+            )]
+            released = 0
+            for pid in pids:
+                if pid == os.getpid() or pid_alive(pid):
+                    continue
+                released += conn.execute(
+                    """
+                    UPDATE notifications SET status = 'pending', claimed_by = NULL, next_attempt_at = MIN(next_attempt_at, ?)
+                    WHERE status IN ('delivering', 'awaiting_pages') AND claimed_by IS ?
+                    """,
+                    (time.time(), pid),
+                ).rowcount
+            return released
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                await self._dispatch_once()
+            except Exception as e:
+                # e.g. "database is locked" under load: keep dispatching instead of ending the task
+                logger.exception(f"Notification dispatcher error: {e}")
+                await asyncio.sleep(NOTIFY_POLL_INTERVAL)
+
+    async def _dispatch_once(self) -> None:
+        """Claim and start the due deliveries, then wait until more may be due."""
+        self._wake.clear()
+        now = time.time()
+        self._migrate()
+        if self._release_dead():
+            logger.info("Released notifications claimed by an exited worker process")
+        with self._store.transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, evaluation_url, payload, attempts FROM notifications
+                WHERE status IN ('pending', 'awaiting_pages') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT 100
+                """,
+                (now,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE notifications SET status = 'delivering', claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(os.getpid(), now, row[0]) for row in rows],
+            )
+            conn.execute(
+                "DELETE FROM notifications WHERE status = 'delivered' AND delivered_at < ?",
+                (now - NOTIFY_RETENTION,),
+            )
+            # Held rows are due at their deadline even if release() never comes
+            next_due = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM notifications WHERE status IN ('pending', 'awaiting_pages')"
+            ).fetchone()[0]
+
+        for row in rows:
+            task = asyncio.create_task(self._deliver(*row))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+        if rows:
+            return
+        # Other processes may enqueue rows without waking this one, so never sleep indefinitely
+        timeout = NOTIFY_POLL_INTERVAL
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, next_due - time.time()))
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _semaphore(self, evaluation_url: str) -> asyncio.Semaphore:
+        try:
+            host = urlsplit(evaluation_url).netloc
+        except ValueError:
+            # Malformed URL: the delivery attempt reports the error
+            host = evaluation_url
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(NOTIFY_PER_DESTINATION_CONCURRENCY)
+        return self._semaphores[host]
+
+    async def _deliver(self, row_id: int, evaluation_url: str, payload: str, attempts: int) -> None:
+        error = None
+        trace_id.set(json.loads(payload).get("nonce") or "-")
+        async with self._semaphore(evaluation_url):
+            try:
+                with span("notify_delivery"):
+                    resp = await self._client.post(
+                        evaluation_url,
+                        content=payload,
+                        headers={"Content-Type": "application/json"},
+                    )
+                if resp.status_code == 200:
+                    self._execute(
+                        "UPDATE notifications SET status = 'delivered', attempts = ?, delivered_at = ? WHERE id = ?",
+                        (attempts + 1, time.time(), row_id),
+                    )
+                    logger.info(f"Successfully notified evaluation server (attempt {attempts + 1})")
+                    count("notify_delivered")
+                    return
+                error = f"Server responded with {resp.status_code}: {resp.text[:500]}"
+            except httpx.HTTPError as e:
+                error = f"Error notifying server: {e}"
+            except Exception as e:
+                # e.g. httpx.InvalidURL, which is not an HTTPError: retry and eventually fail the
+                # row instead of leaving it claimed forever
+                error = f"Error notifying server: {type(e).__name__}: {e}"
+
+        attempts += 1
+        logger.warning(error)
+        if attempts >= NOTIFY_MAX_ATTEMPTS:
+            self._execute(
+                "UPDATE notifications SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, error, row_id),
+            )
+            logger.error(f"Failed to notify evaluation server after {attempts} attempts")
+            count("notify_failed")
+            return
+
+        delay = min(NOTIFY_MAX_DELAY, NOTIFY_BASE_DELAY * 2 ** (attempts - 1))
+        delay *= random.uniform(0.5, 1.5)
+        self._execute(
+            "UPDATE notifications SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, time.time() + delay, error, row_id),
+        )
+        logger.warning(f"⏳ Retrying in {delay:.1f} seconds...")
+        count("notify_retry")
+        self._wake.set()
+
+
+notification_outbox = NotificationOutbox()
 
 
 def notify_evaluation(
@@ -14,11 +324,11 @@ def notify_evaluation(
     repo_url: str,
     commit_sha: str,
     pages_url: str,
-    max_retries: int = 5
-) -> None:
+    hold_until: Optional[float] = None
+) -> int:
     """
-    POSTs evaluation JSON back to the instructor's server.
-    Retries with exponential backoff on failure.
+    Queues evaluation JSON for delivery to the instructor's server.
+    Returns immediately; the outbox dispatcher delivers it with retries.
 
     Args:
         evaluation_url: URL to POST repo info
@@ -29,7 +339,10 @@ def notify_evaluation(
         repo_url: GitHub repo URL
         commit_sha: latest commit SHA
         pages_url: GitHub Pages URL
-        max_retries: max retry attempts
+        hold_until: hold delivery until notification_outbox.release() or this time
+
+    Returns:
+        id of the outbox entry
     """
 
     payload = {
@@ -42,23 +355,4 @@ def notify_evaluation(
         "pages_url": pages_url
     }
 
-    headers = {"Content-Type": "application/json"}
-
-    delay = 1  # initial delay in seconds
-
-    for attempt in range(max_retries):
-        try:
-            resp = requests.post(evaluation_url, headers=headers, data=json.dumps(payload))
-            if resp.status_code == 200:
-                print(f"Successfully notified evaluation server (attempt {attempt+1})")
-                return
-            else:
-                print(f"Server responded with {resp.status_code}: {resp.text}")
-        except Exception as e:
-            print(f"Error notifying server: {e}")
-
-        print(f"⏳ Retrying in {delay} seconds...")
-        time.sleep(delay)
-        delay *= 2  # exponential backoff
-
-    print(f"Failed to notify evaluation server after {max_retries} attempts")
+    return notification_outbox.enqueue(evaluation_url, payload, hold_until)
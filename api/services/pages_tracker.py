@@ -0,0 +1,160 @@
+# api/services/pages_tracker.py
+
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from api.services.github_service import github_request
+from api.services.metrics import count, span
+
+logger = logging.getLogger("app2app.pages")
+
+load_dotenv()
+
+GITHUB_USER = os.getenv("GITHUB_USER")
+# Seconds to wait for the site to go live before notifying anyway
+PAGES_READY_TIMEOUT = float(os.getenv("PAGES_READY_TIMEOUT", "600"))
+# Polling starts at the initial interval and backs off while nothing changes
+PAGES_POLL_INITIAL = float(os.getenv("PAGES_POLL_INITIAL", "3"))
+PAGES_POLL_MAX = float(os.getenv("PAGES_POLL_MAX", "20"))
+PAGES_POLL_BACKOFF = float(os.getenv("PAGES_POLL_BACKOFF", "1.5"))
+# Also wait for the pages_url itself to answer 2xx once the build is done
+PAGES_CHECK_SITE = os.getenv("PAGES_CHECK_SITE", "1") == "1"
+
+
+class PagesTracker:
+    """
+    Waits for GitHub Pages deployments to go live before running a callback
+    (the evaluation notification), so the evaluator never loads a page that
+    is still building.
+
+    Each tracked repo is polled by its own asyncio task through the shared
+    GitHub rate limiter. Polls of pages/builds/latest are conditional
+    (If-None-Match with the last ETag, so unchanged answers come back as 304
+    and do not count against the quota) and the interval grows while the
+    build makes no progress. Callbacks still pending on shutdown are run
+    immediately. Tracking itself is in memory only: the notification a
+    callback releases is already held in the outbox with the same deadline,
+    so a crash delays it instead of losing it.
+    """
+
+    def __init__(
+        self,
+        timeout: float = PAGES_READY_TIMEOUT,
+        initial_interval: float = PAGES_POLL_INITIAL,
+        max_interval: float = PAGES_POLL_MAX,
+        check_site: bool = PAGES_CHECK_SITE
+    ):
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.check_site = check_site
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tracking: Dict[asyncio.Task, Callable[[], None]] = {}
+        self.ready = 0
+        self.timed_out = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10, follow_redirects=True)
+
+    async def stop(self) -> None:
+        pending = list(self._tracking.items())
+        for task, _ in pending:
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in pending), return_exceptions=True)
+        for _, callback in pending:
+            callback()
+        self._tracking.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"tracking": len(self._tracking), "ready": self.ready, "timed_out": self.timed_out}
+
+    def track(self, task_name: str, commit_sha: str, pages_url: str, callback: Callable[[], None]) -> asyncio.Task:
+        """
+        Run callback once the Pages site of task_name serves commit_sha, or
+        when the deadline passes. Returns immediately.
+
+        Args:
+            task_name: repo name
+            commit_sha: commit that must be deployed
+            pages_url: public URL of the site
+            callback: called without arguments exactly once
+        """
+        task = asyncio.create_task(self._wait_and_call(task_name, commit_sha, pages_url, callback))
+        self._tracking[task] = callback
+        return task
+
+    async def _wait_and_call(self, task_name: str, commit_sha: str, pages_url: str, callback) -> None:
+        try:
+            with span("pages_ready"):
+                live = await asyncio.wait_for(self._wait_until_live(task_name, commit_sha, pages_url), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            count("pages_ready_timeout")
+            logger.warning(f"GitHub Pages not live after {self.timeout:.0f}s; notifying anyway")
+        else:
+            if live:
+                self.ready += 1
+                logger.info(f"GitHub Pages live at {pages_url}")
+        del self._tracking[asyncio.current_task()]
+        callback()
+
+    async def _wait_until_live(self, task_name: str, commit_sha: str, pages_url: str) -> bool:
+        path = f"/repos/{GITHUB_USER}/{task_name}/pages/builds/latest"
+        etag = None
+        last_status = None
+        interval = self.initial_interval
+
+        while True:
+            await asyncio.sleep(interval)
+            headers = {"If-None-Match": etag} if etag else None
+            try:
+                resp = await github_request("GET", path, headers=headers)
+            except httpx.HTTPError as e:
+                logger.warning(f"Pages build poll failed: {e}")
+                interval = min(self.max_interval, interval * PAGES_POLL_BACKOFF)
+                continue
+
+            if resp.status_code == 200:
+                etag = resp.headers.get("ETag", etag)
+                build = resp.json()
+                status = (build.get("status"), build.get("commit"))
+                if status[0] == "built" and status[1] == commit_sha:
+                    break
+                if status[0] == "errored" and status[1] == commit_sha:
+                    logger.warning(f"GitHub Pages build errored: {build.get('error')}; notifying anyway")
+                    return False
+                if status != last_status:
+                    # The build moved on: look again soon
+                    last_status = status
+                    interval = self.initial_interval
+                    continue
+            # 304 (unchanged), 404 (no build yet) or a transient error
+            interval = min(self.max_interval, interval * PAGES_POLL_BACKOFF)
+
+        if not self.check_site:
+            return True
+        await self.start()
+
+        # The build is done; wait for the CDN to serve the site
+        interval = self.initial_interval
+        while True:
+            try:
+                resp = await self._client.head(pages_url)
+                if resp.status_code < 400:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(interval)
+            interval = min(self.max_interval, interval * PAGES_POLL_BACKOFF)
+
+
+pages_tracker = PagesTracker()
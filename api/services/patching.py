@@ -0,0 +1,182 @@
+# api/services/patching.py
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Files sent to the model (and patchable) in incremental revisions
+TEXT_EXTENSIONS = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".md", ".txt", ".svg", ".xml", ".csv")
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a revision is malformed or does not apply to the current files."""
+
+
+def is_text_path(path: str) -> bool:
+    return path.lower().endswith(TEXT_EXTENSIONS)
+
+
+def check_path(path: str) -> None:
+    """Reject paths that could escape the repo root or are not plain relative paths."""
+    parts = path.split("/")
+    if not path or path.startswith("/") or "\\" in path or any(p in ("", ".", "..") for p in parts):
+        raise PatchError(f"Invalid file path {path!r}")
+
+
+def parse_hunks(diff: str) -> List[Tuple[int, int, List[Tuple[str, str]]]]:
+    """
+    Split a unified diff for one file into hunks.
+
+    Returns:
+        list of (old_start, old_count, lines) where lines are (op, text) and op is " ", "-" or "+"
+
+    Raises:
+        PatchError: if the diff has no hunks or a line outside any known form
+    """
+    hunks = []
+    current = None
+    # Old/new lines the current hunk's header says are still to come
+    old_left = new_left = 0
+    lines = diff.rstrip("\n").splitlines()
+    for i, line in enumerate(lines):
+        in_body = current is not None and (old_left > 0 or new_left > 0)
+        match = _HUNK.match(line)
+        if match:
+            old_count = int(match.group(2)) if match.group(2) is not None else 1
+            old_left = old_count
+            new_left = int(match.group(4)) if match.group(4) is not None else 1
+            current = (int(match.group(1)), old_count, [])
+            hunks.append(current)
+        elif current is None or (
+            # Inside a hunk a "-- x" line followed by "++ y" is a removal and an addition,
+            # so headers are only recognised once the hunk's declared lengths are used up
+            not in_body and line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+        ):
+            # File headers (---/+++), "diff --git" and similar preamble
+            current = None
+        elif line.startswith("\\"):
+            # "\ No newline at end of file"
+            continue
+        elif line == "":
+            # Models often drop the leading space of blank context lines
+            current[2].append((" ", ""))
+            old_left -= 1
+            new_left -= 1
+        elif line[0] in " -+":
+            current[2].append((line[0], line[1:]))
+            old_left -= line[0] in " -"
+            new_left -= line[0] in " +"
+        else:
+            raise PatchError(f"Unexpected line in diff: {line[:80]!r}")
+    if not hunks:
+        raise PatchError("Diff contains no hunks")
+    return hunks
+
+
+def _matches(lines: List[str], at: int, old: List[str]) -> bool:
+    if at < 0 or at + len(old) > len(lines):
+        return False
+    return all(lines[at + k].rstrip() == text.rstrip() for k, text in enumerate(old))
+
+
+def _locate(lines: List[str], old: List[str], expected: int, lower: int) -> Optional[int]:
+    """Where the hunk's old lines start: at the expected line if they match there, else at the nearest match."""
+    # The model's line numbers may be far off: start from the nearest valid position and search anyway
+    expected = min(max(expected, lower), len(lines))
+    if not old:
+        return expected
+    for offset in range(len(lines) + 1):
+        for at in (expected - offset, expected + offset) if offset else (expected,):
+            if at >= lower and _matches(lines, at, old):
+                return at
+    return None
+
+
+def apply_patch(original: str, diff: str) -> str:
+    """
+    Apply a unified diff to original.
+
+    Hunks are applied in order; each one must match the file exactly (up to
+    trailing whitespace) at its stated line or, if the line numbers are off,
+    at the nearest place after the previous hunk. The file keeps its line
+    endings (CRLF or LF), so an unchanged line stays byte-identical.
+
+    Raises:
+        PatchError: if the diff is malformed or a hunk does not match
+    """
+    newline = "\r\n" if "\r\n" in original else "\n"
+    lines = original.splitlines()
+    out: List[str] = []
+    pos = 0
+    for old_start, old_count, body in parse_hunks(diff):
+        old = [text for op, text in body if op in " -"]
+        new = [text for op, text in body if op in " +"]
+        # A hunk that removes nothing (-N,0) inserts after line N
+        expected = old_start if old_count == 0 else old_start - 1
+        at = _locate(lines, old, expected, pos)
+        if at is None:
+            raise PatchError(f"Hunk at line {old_start} does not match the current file")
+        out.extend(lines[pos:at])
+        out.extend(new)
+        pos = at + len(old)
+    out.extend(lines[pos:])
+    return newline.join(out) + (newline if original.endswith("\n") or not original else "")
+
+
+def apply_revision(
+    current: Dict[str, str],
+    files: Dict[str, str],
+    patches: Dict[str, str],
+    protected: Iterable[str] = ()
+) -> Dict[str, str]:
+    """
+    Apply a model's revision to the current files and validate the result.
+
+    Args:
+        current: path -> content of the files on main
+        files: path -> full new content (new or rewritten files)
+        patches: path -> unified diff against the current content
+        protected: paths the revision must not touch (attachments, LICENSE)
+
+    Returns:
+        path -> new content, for the files whose content actually changed
+
+    Raises:
+        PatchError: if a path is invalid or protected, a patch does not apply,
+            or the resulting app fails validation
+    """
+    if not isinstance(files, dict) or not isinstance(patches, dict):
+        raise PatchError("Revision must map file names to contents and diffs")
+    protected = set(protected)
+    changed: Dict[str, str] = {}
+
+    for path, content in [*files.items(), *patches.items()]:
+        check_path(path)
+        if path in protected:
+            raise PatchError(f"Revision modifies protected file {path}")
+        if not isinstance(content, str):
+            raise PatchError(f"Content of {path} is not a string")
+    both = set(files) & set(patches)
+    if both:
+        raise PatchError(f"{sorted(both)[0]} is both rewritten and patched")
+
+    for path, diff in patches.items():
+        if path not in current:
+            raise PatchError(f"Patch for {path}, which is not a current file")
+        changed[path] = apply_patch(current[path], diff)
+    changed.update(files)
+    changed = {path: content for path, content in changed.items() if current.get(path) != content}
+
+    result = {**current, **changed}
+    if not result.get("index.html", "").strip():
+        raise PatchError("Revision leaves index.html missing or empty")
+    for path, content in changed.items():
+        if os.path.splitext(path)[1].lower() == ".json":
+            try:
+                json.loads(content)
+            except ValueError as e:
+                raise PatchError(f"{path} is not valid JSON after the revision: {e}")
+    return changed
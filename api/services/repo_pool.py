@@ -0,0 +1,216 @@
+# api/services/repo_pool.py
+
+import asyncio
+import logging
+import os
+import secrets
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from api.services.github_client import GitHubError
+from api.services.github_service import enable_pages, get_or_create_repo, github_api
+from api.services.metrics import count
+from api.services.state_store import StateStore, pid_alive, state_store
+
+logger = logging.getLogger("app2app.repo_pool")
+
+load_dotenv()
+
+GITHUB_USER = os.getenv("GITHUB_USER")
+# Placeholder repos kept ready for new tasks (0 disables the pool)
+REPO_POOL_SIZE = int(os.getenv("REPO_POOL_SIZE", "0"))
+# Name prefix of placeholder repos
+REPO_POOL_PREFIX = os.getenv("REPO_POOL_PREFIX", "app2app-pool-")
+# Placeholder repos created at the same time while refilling
+REPO_POOL_REFILL_CONCURRENCY = int(os.getenv("REPO_POOL_REFILL_CONCURRENCY", "2"))
+# Seconds between checks that the pool is full (claims also trigger a refill)
+REPO_POOL_CHECK_INTERVAL = float(os.getenv("REPO_POOL_CHECK_INTERVAL", "60"))
+# Seconds to wait after a failed refill before trying again
+REPO_POOL_RETRY_DELAY = float(os.getenv("REPO_POOL_RETRY_DELAY", "30"))
+
+
+class RepoPool:
+    """
+    Pool of pre-created placeholder repos, each already initialized with a
+    license and with Pages enabled, so a round 1 build only has to push its
+    files.
+
+    A new task claims a placeholder by renaming it (one PATCH) instead of
+    creating a repo and enabling Pages while the request waits; a background
+    task refills the pool. Pool membership lives in the shared state store,
+    so worker processes draw from and refill one pool, and a placeholder is
+    handed to exactly one task.
+    """
+
+    def __init__(self, size: int = REPO_POOL_SIZE, prefix: str = REPO_POOL_PREFIX, store: StateStore = state_store):
+        self.size = size
+        self.prefix = prefix
+        self.store = store
+        self.store.register_schema(
+            """
+            CREATE TABLE IF NOT EXISTS repo_pool (
+                name TEXT PRIMARY KEY,
+                status TEXT,
+                created_at REAL,
+                pid INTEGER
+            )
+            """
+        )
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.claimed = 0
+        self.misses = 0
+
+    async def start(self) -> None:
+        if self.size <= 0:
+            return
+        self._recover()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"ready": 0, "creating": 0, "claiming": 0}
+        for status, total in self.store.execute("SELECT status, COUNT(*) FROM repo_pool GROUP BY status"):
+            counts[status] = total
+        counts.update(size=self.size, claimed=self.claimed, misses=self.misses)
+        return counts
+
+    async def claim(self, task_name: str) -> Optional[dict]:
+        """
+        Rename a ready placeholder repo to task_name.
+
+        Returns:
+            the renamed repo, or None if no placeholder is ready or task_name is already taken
+        """
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT name FROM repo_pool WHERE status = 'ready' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE repo_pool SET status = 'claiming', pid = ? WHERE name = ?", (os.getpid(), row[0])
+                )
+        if row is None:
+            self.misses += 1
+            count("repo_pool_miss")
+            self._refill_soon()
+            return None
+
+        name = row[0]
+        try:
+            repo = await github_api("PATCH", f"/repos/{GITHUB_USER}/{name}", json={
+                "name": task_name,
+                "description": f"Generated by LLM Code Deployment for task {task_name}"
+            })
+        except GitHubError as e:
+            if e.status == 422:
+                # A repo named task_name already exists: keep the placeholder for the next task
+                self.store.execute("UPDATE repo_pool SET status = 'ready' WHERE name = ?", (name,))
+                return None
+            logger.warning(f"Could not claim placeholder repo {name}: {e}")
+            self.store.execute("DELETE FROM repo_pool WHERE name = ?", (name,))
+            self._refill_soon()
+            return None
+
+        self.store.execute("DELETE FROM repo_pool WHERE name = ?", (name,))
+        self.claimed += 1
+        count("repo_pool_claim")
+        logger.info(f"Claimed placeholder repo {name} as {repo['full_name']}")
+        self._refill_soon()
+        return repo
+
+    async def get_or_claim_repo(self, task_name: str) -> dict:
+        """Drop-in for get_or_create_repo that takes a placeholder from the pool when one is ready."""
+        repo = await self.claim(task_name) if self.size > 0 else None
+        return repo or await get_or_create_repo(task_name)
+
+    def _refill_soon(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def _recover(self) -> None:
+        """
+        Release rows tagged with this process's pid: a restarted process may
+        reuse its old pid (PID 1 in a container), and nothing is in flight yet,
+        so they were left behind by the previous run.
+        """
+        with self.store.transaction() as conn:
+            # The rename may have happened: never hand this repo out again
+            conn.execute("DELETE FROM repo_pool WHERE status = 'claiming' AND pid = ?", (os.getpid(),))
+            # Untagged rows are picked up and finished by the next _reserve()
+            conn.execute("UPDATE repo_pool SET pid = NULL WHERE status = 'creating' AND pid = ?", (os.getpid(),))
+
+    def _reserve(self) -> List[str]:
+        """
+        Pick the placeholders this process should prepare now: ones left
+        half-created by a process that exited or by a failed attempt, then
+        new names up to the pool size.
+        """
+        with self.store.transaction() as conn:
+            rows = conn.execute("SELECT name, status, pid FROM repo_pool WHERE status != 'ready'").fetchall()
+            names = []
+            for name, status, pid in rows:
+                if pid_alive(pid):
+                    continue
+                if status == "claiming":
+                    # The rename may have happened: never hand this repo out again
+                    conn.execute("DELETE FROM repo_pool WHERE name = ?", (name,))
+                else:
+                    conn.execute("UPDATE repo_pool SET pid = ? WHERE name = ?", (os.getpid(), name))
+                    names.append(name)
+            total = conn.execute("SELECT COUNT(*) FROM repo_pool").fetchone()[0]
+            while total < self.size and len(names) < REPO_POOL_REFILL_CONCURRENCY:
+                name = f"{self.prefix}{secrets.token_hex(4)}"
+                conn.execute(
+                    "INSERT INTO repo_pool (name, status, created_at, pid) VALUES (?, 'creating', ?, ?)",
+                    (name, time.time(), os.getpid()),
+                )
+                names.append(name)
+                total += 1
+            return names
+
+    async def _prepare(self, name: str) -> None:
+        """Create a placeholder with a license and Pages enabled (safe to repeat for the same name)."""
+        try:
+            await get_or_create_repo(name)
+            # A placeholder without a site is no use: leave it unready and retry
+            await enable_pages(name, check=True)
+        except Exception as e:
+            logger.warning(f"Could not prepare placeholder repo {name}: {e}")
+            # The repo may already exist on GitHub: keep tracking it, untagged, so the
+            # next refill finishes preparing it instead of leaving it behind
+            self.store.execute("UPDATE repo_pool SET pid = NULL WHERE name = ?", (name,))
+            raise
+        self.store.execute("UPDATE repo_pool SET status = 'ready' WHERE name = ?", (name,))
+        logger.info(f"Placeholder repo {name} ready")
+
+    async def _refill_loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                names = self._reserve()
+            except Exception as e:
+                # e.g. "database is locked": keep the refill task alive so the pool does not drain
+                logger.warning(f"Could not reserve placeholder repos: {e}")
+                await asyncio.sleep(REPO_POOL_RETRY_DELAY)
+                continue
+            if names:
+                results = await asyncio.gather(*(self._prepare(name) for name in names), return_exceptions=True)
+                if any(isinstance(r, Exception) for r in results):
+                    await asyncio.sleep(REPO_POOL_RETRY_DELAY)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), REPO_POOL_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+repo_pool = RepoPool()
@@ -0,0 +1,110 @@
+# api/services/state_store.py
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Job and idempotency state shared by every worker process on the host
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "results/state.db")
+# Milliseconds a process waits for another one's write lock before failing
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database for sharing between worker processes: WAL mode so
+    readers never block the writer, a busy timeout instead of immediate
+    "database is locked" errors, and autocommit so explicit transactions
+    (BEGIN IMMEDIATE) can be used where several statements must be atomic.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=SQLITE_BUSY_TIMEOUT / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    return conn
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """Whether a process with this pid is still running on the host."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class StateStore:
+    """
+    One connection per process to a shared SQLite file.
+
+    transaction() takes the database write lock up front (BEGIN IMMEDIATE),
+    so a read-then-write sequence is atomic across processes; nested calls
+    from the same thread join the outer transaction.
+    """
+
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._depth = 0
+        self._schema: List[str] = []
+
+    def register_schema(self, *statements: str) -> None:
+        """Statements (CREATE TABLE/INDEX IF NOT EXISTS ...) run when the connection opens."""
+        self._schema.extend(statements)
+        if self._conn is not None:
+            for statement in statements:
+                self._conn.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                self._conn = connect(self.path)
+                for statement in self._schema:
+                    self._conn.execute(statement)
+            return self._conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self.connection()
+            if self._depth == 0:
+                conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                conn.execute("COMMIT")
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Run one statement; inside transaction() it joins the open transaction."""
+        with self._lock:
+            return self.connection().execute(sql, params)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+state_store = StateStore()
@@ -0,0 +1,26 @@
+# api/services/utils.py
+
+import hashlib
+import os
+
+
+def git_blob_sha(content) -> str:
+    """
+    Compute the git blob SHA-1 of a file's content, exactly as `git hash-object`
+    (and GitHub's tree listings) would report it.
+
+    Args:
+        content: file content as str (encoded as UTF-8) or bytes
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    header = f"blob {len(data)}\0".encode("ascii")
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def git_blob_sha_file(path: str, chunk_size: int = 64 * 1024) -> str:
+    """Same as git_blob_sha, reading the file in chunks instead of loading it whole."""
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode("ascii"))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -7,5 +7,12 @@ pip install -r requirements.txt
 echo "🧠 Installing Playwright browsers..."
 playwright install chromium
 
-echo "🚀 Starting Main API..."
-exec uvicorn api.main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+# One worker process per core; they share state through SQLite in results/
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-$(nproc)}
+# Metric samples of every worker, aggregated by /metrics (cleared on each start)
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/app2app-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+echo "🚀 Starting Main API with $WEB_CONCURRENCY workers..."
+exec uvicorn api.main:app --host 0.0.0.0 --port $PORT --workers $WEB_CONCURRENCY
@@ -0,0 +1,334 @@
+"""
+Local stand-ins for every external service the API talks to:
+
+- Gemini generate endpoints   /v1beta/models/{model}:generateContent and :streamGenerateContent
+- OpenAI chat completions     /v1/chat/completions (plain and streamed)
+- GitHub REST + Git Data API  /github/...
+- Evaluation notify endpoint  /notify
+
+Each service has a configurable injected latency and error rate, and every
+call is timed so the benchmark can report where time was spent.
+"""
+import asyncio
+import base64
+import difflib
+import hashlib
+import json
+import random
+import time
+from collections import defaultdict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api.services.utils import git_blob_sha
+
+
+class FakeConfig:
+    def __init__(self):
+        # Seconds added to every call of each service
+        self.latency = {"llm": 1.0, "github": 0.05, "notify": 0.02}
+        # Probability that a call fails with a 500
+        self.error_rate = {"llm": 0.0, "github": 0.0, "notify": 0.0}
+        # Probability that an LLM call is slow_factor times slower than usual (tail latency);
+        # streamed responses spend the extra time before their first chunk, like a queued request
+        self.slow_rate = 0.0
+        self.slow_factor = 10.0
+        # Shape of the generated app
+        self.app_files = 4
+        self.file_size = 2000
+        self.stream_chunks = 20
+        self.seed = 0
+
+
+config = FakeConfig()
+app = FastAPI(title="Fake external services")
+
+# stage -> list of call durations in seconds
+timings = defaultdict(list)
+# nonce -> time the notification was received
+notifications = {}
+_rng = random.Random()
+
+
+def reset(github_state=False):
+    """Clear recorded timings and notifications (and the fake repos if github_state)."""
+    timings.clear()
+    notifications.clear()
+    _github.calls = 0
+    if github_state:
+        _github.__init__()
+    _rng.seed(config.seed)
+
+
+def _latency(stage):
+    latency = config.latency[stage]
+    if stage == "llm" and _rng.random() < config.slow_rate:
+        latency *= config.slow_factor
+    return latency
+
+
+def _stream_delays():
+    """Delay before each streamed chunk: the normal latency spread out, plus any slowdown up front."""
+    total = _latency("llm")
+    per_chunk = config.latency["llm"] / config.stream_chunks
+    return [total - config.latency["llm"] + per_chunk] + [per_chunk] * (config.stream_chunks - 1)
+
+
+async def _inject(stage):
+    """Apply the configured latency; return True if this call should fail."""
+    await asyncio.sleep(_latency(stage))
+    return _rng.random() < config.error_rate[stage]
+
+
+# -------------------------------
+# Gemini
+# -------------------------------
+REVISE_MARKER = "Current files, as a JSON object with filenames as keys and contents as values:"
+
+
+def revised_app(prompt: str, digest: str) -> str:
+    """Answer to an incremental revise prompt: diffs against the current files it contains."""
+    current, _ = json.JSONDecoder().raw_decode(prompt.split(REVISE_MARKER, 1)[1].lstrip())
+    patches = {}
+    for name in ("index.html", "README.md"):
+        if name not in current:
+            continue
+        old = current[name]
+        new = old.replace("</body>", f"<p>{digest[:8]}</p></body>") if name == "index.html" else old + f"\nRevised: {digest[:8]}\n"
+        patches[name] = "\n".join(difflib.unified_diff(
+            old.splitlines(), new.splitlines(), f"a/{name}", f"b/{name}", lineterm=""
+        ))
+    return "```json\n" + json.dumps({"patches": patches, "files": {}}, indent=2) + "\n```"
+
+
+def generated_app(prompt: str) -> str:
+    """Deterministic filename -> content JSON for a prompt."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    if REVISE_MARKER in prompt:
+        return revised_app(prompt, digest)
+    filler = (digest * (config.file_size // len(digest) + 1))[:config.file_size]
+    files = {"index.html": f"<!DOCTYPE html><html><body><h1>{digest[:8]}</h1><!-- {filler} --></body></html>"}
+    files["README.md"] = f"# App {digest[:8]}\n\n{filler}\n"
+    for i in range(max(0, config.app_files - 2)):
+        files[f"script{i}.js"] = f"// {filler}\nconsole.log({i});\n"
+    return "```json\n" + json.dumps(files, indent=2) + "\n```"
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini(model_action: str, request: Request):
+    start = time.perf_counter()
+    body = await request.json()
+    prompt = "".join(part.get("text", "") for c in body.get("contents", []) for part in c.get("parts", []))
+    text = generated_app(prompt)
+
+    if model_action.endswith(":streamGenerateContent"):
+        async def stream():
+            if _rng.random() < config.error_rate["llm"]:
+                yield "data: " + json.dumps({"error": {"code": 500, "message": "injected"}}) + "\r\n\r\n"
+                return
+            size = len(text) // config.stream_chunks + 1
+            delays = _stream_delays()
+            for n, i in enumerate(range(0, len(text), size)):
+                await asyncio.sleep(delays[min(n, len(delays) - 1)])
+                yield "data: " + json.dumps(_candidate(text[i:i + size])) + "\r\n\r\n"
+            timings["llm"].append(time.perf_counter() - start)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    failed = await _inject("llm")
+    timings["llm"].append(time.perf_counter() - start)
+    if failed:
+        return JSONResponse(status_code=500, content={"error": {"code": 500, "message": "injected"}})
+    return _candidate(text)
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    start = time.perf_counter()
+    body = await request.json()
+    prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+    text = generated_app(prompt)
+    base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "bench")}
+
+    if body.get("stream"):
+        async def stream():
+            size = len(text) // config.stream_chunks + 1
+            delays = _stream_delays()
+            for n, i in enumerate(range(0, len(text), size)):
+                await asyncio.sleep(delays[min(n, len(delays) - 1)])
+                chunk = dict(base, object="chat.completion.chunk", choices=[
+                    {"index": 0, "delta": {"content": text[i:i + size]}, "finish_reason": None}
+                ])
+                yield "data: " + json.dumps(chunk) + "\n\n"
+            yield "data: [DONE]\n\n"
+            timings["llm"].append(time.perf_counter() - start)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    failed = await _inject("llm")
+    timings["llm"].append(time.perf_counter() - start)
+    if failed:
+        return JSONResponse(status_code=500, content={"error": {"message": "injected"}})
+    return dict(base, object="chat.completion", choices=[
+        {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+    ])
+
+
+# -------------------------------
+# GitHub
+# -------------------------------
+class FakeGitHub:
+    def __init__(self):
+        self.repos = {}    # name -> {"head": commit sha}
+        self.commits = {}  # commit sha -> tree sha
+        self.trees = {}    # tree sha -> {path: blob sha}
+        self.blobs = {}    # blob sha -> content bytes
+        self.calls = 0
+
+    def _store_tree(self, files):
+        sha = hashlib.sha1(json.dumps(sorted(files.items())).encode()).hexdigest()
+        self.trees[sha] = dict(files)
+        return sha
+
+    def _store_commit(self, tree_sha, parent):
+        sha = hashlib.sha1(f"{tree_sha}:{parent}:{time.time()}".encode()).hexdigest()
+        self.commits[sha] = tree_sha
+        return sha
+
+    def store_blob(self, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        sha = git_blob_sha(content)
+        self.blobs[sha] = content
+        return sha
+
+    def create_repo(self, name):
+        license_sha = self.store_blob(b"MIT License")
+        head = self._store_commit(self._store_tree({"LICENSE": license_sha}), None)
+        self.repos[name] = {"head": head}
+
+
+_github = FakeGitHub()
+
+
+def _repo_json(owner, name):
+    return {
+        "name": name,
+        "full_name": f"{owner}/{name}",
+        "html_url": f"https://github.com/{owner}/{name}",
+        "has_pages": _github.repos[name].get("pages", False),
+    }
+
+
+@app.api_route("/github/{path:path}", methods=["GET", "POST", "PATCH", "PUT"])
+async def github(path: str, request: Request):
+    start = time.perf_counter()
+    failed = await _inject("github")
+    _github.calls += 1
+    try:
+        if failed:
+            return JSONResponse(status_code=500, content={"message": "injected"})
+        body = await request.json() if await request.body() else {}
+        status, content = _github_route(request.method, path.strip("/").split("/"), body)
+        return JSONResponse(
+            status_code=status,
+            content=content,
+            headers={"X-RateLimit-Remaining": "4999", "X-RateLimit-Limit": "5000",
+                     "X-RateLimit-Reset": str(int(time.time()) + 3600)},
+        )
+    finally:
+        timings["github"].append(time.perf_counter() - start)
+
+
+def _github_route(method, parts, body):
+    if parts == ["user", "repos"] and method == "POST":
+        _github.create_repo(body["name"])
+        return 201, _repo_json("bench", body["name"])
+    if parts[0] != "repos" or len(parts) < 3:
+        return 404, {"message": "Not Found"}
+
+    owner, name, rest = parts[1], parts[2], parts[3:]
+    repo = _github.repos.get(name)
+    if repo is None:
+        return 404, {"message": "Not Found"}
+    if not rest:
+        if method == "PATCH" and body.get("name", name) != name:
+            if body["name"] in _github.repos:
+                return 422, {"message": "name already exists on this account"}
+            _github.repos[body["name"]] = _github.repos.pop(name)
+            name = body["name"]
+        return 200, _repo_json(owner, name)
+
+    if rest == ["pages"]:
+        if repo.get("pages"):
+            return 409, {"message": "GitHub Pages is already enabled."}
+        repo["pages"] = True
+        return 201, {"html_url": f"https://{owner}.github.io/{name}/"}
+    if rest[:2] == ["pages", "builds"]:
+        return 200, {"status": "built", "commit": repo["head"]}
+    if rest[:3] == ["git", "ref", "heads"] or rest[:3] == ["git", "refs", "heads"]:
+        if method == "PATCH":
+            repo["head"] = body["sha"]
+        return 200, {"object": {"sha": repo["head"]}}
+    if rest[:2] == ["git", "commits"]:
+        if method == "POST":
+            sha = _github._store_commit(body["tree"], body["parents"][0] if body["parents"] else None)
+            return 201, {"sha": sha}
+        return 200, {"sha": rest[2], "tree": {"sha": _github.commits[rest[2]]}}
+    if rest[:2] == ["git", "trees"]:
+        if method == "POST":
+            files = dict(_github.trees.get(body.get("base_tree"), {}))
+            for element in body["tree"]:
+                files[element["path"]] = element.get("sha") or _github.store_blob(element["content"])
+            return 201, {"sha": _github._store_tree(files)}
+        files = _github.trees[rest[2]]
+        return 200, {"sha": rest[2], "tree": [
+            {"path": p, "sha": s, "type": "blob", "mode": "100644"} for p, s in files.items()
+        ]}
+    if rest[:2] == ["git", "blobs"] and method == "POST":
+        content = body["content"]
+        if body.get("encoding") == "base64":
+            content = base64.b64decode(content)
+        return 201, {"sha": _github.store_blob(content)}
+    if rest[:2] == ["git", "blobs"]:
+        content = _github.blobs.get(rest[2])
+        if content is None:
+            return 404, {"message": "Not Found"}
+        return 200, {"sha": rest[2], "size": len(content), "encoding": "base64",
+                     "content": base64.b64encode(content).decode("ascii")}
+    if rest[0] == "contents" and method == "PUT":
+        sha = _github.store_blob(base64.b64decode(body["content"]))
+        files = dict(_github.trees[_github.commits[repo["head"]]])
+        files["/".join(rest[1:])] = sha
+        repo["head"] = _github._store_commit(_github._store_tree(files), repo["head"])
+        return 201, {"commit": {"sha": repo["head"]}}
+    return 404, {"message": "Not Found"}
+
+
+# -------------------------------
+# Evaluation server
+# -------------------------------
+@app.post("/notify")
+async def notify(request: Request):
+    start = time.perf_counter()
+    failed = await _inject("notify")
+    timings["notify"].append(time.perf_counter() - start)
+    if failed:
+        return JSONResponse(status_code=500, content={"status": "error"})
+    payload = await request.json()
+    notifications.setdefault(payload.get("nonce"), time.time())
+    return {"status": "received"}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "calls": {stage: len(values) for stage, values in timings.items()},
+        "github_calls": _github.calls,
+        "notifications": len(notifications),
+    }
@@ -0,0 +1,261 @@
+"""
+Offline end-to-end benchmark of the build/revise pipeline.
+
+Runs api.main:app in a subprocess pointed at local fake Gemini, GitHub and
+evaluator servers (tests/benchmark/fake_services.py), drives it with the
+load driver and reports end-to-end and per-stage latency, throughput and
+peak memory. No network access or credentials are needed.
+
+Usage:
+    python -m tests.benchmark.run_benchmark --tasks 100 --concurrency 20 \
+        --llm-latency 2 --github-latency 0.1 --revise --json bench.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import httpx
+import uvicorn
+
+from tests.benchmark import fake_services
+from tests.load_driver import percentile, run as run_load
+
+
+def start_fake_services(port):
+    server = uvicorn.Server(uvicorn.Config(fake_services.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def start_api(port, fake_url, workdir, args):
+    env = dict(os.environ)
+    env.update({
+        "STUDENT_SECRET": "bench",
+        "GITHUB_USER": "bench",
+        "GITHUB_TOKEN": "bench",
+        "GOOGLE_API_KEY": "bench",
+        "GEMINI_BASE_URL": fake_url,
+        "OPENAI_API_KEY": "bench" if args.openai else "",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "GITHUB_API_URL": f"{fake_url}/github",
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db"),
+        "LLM_CACHE_BYPASS": "0" if args.cache else "1",
+        "NOTIFY_OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+        "ATTACHMENTS_DIR": os.path.join(workdir, "attachments"),
+        "NOTIFY_BASE_DELAY": "0.1",
+        "PAGES_POLL_INITIAL": "0.05",
+        "PAGES_CHECK_SITE": "0",
+        "STATE_DB_PATH": os.path.join(workdir, "state.db"),
+        "MAX_CONCURRENT_JOBS": str(args.workers),
+        "WEB_CONCURRENCY": str(args.api_workers),
+        "REPO_POOL_SIZE": str(args.repo_pool),
+        "REPO_POOL_REFILL_CONCURRENCY": "8",
+    })
+    if args.api_workers > 1:
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(workdir, "metrics")
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    env.update(dict(item.split("=", 1) for item in args.env))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.api_workers), "--log-level", "warning"],
+        env=env,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("API did not start")
+
+
+async def wait_for_repo_pool(api_url, args):
+    """Let the API fill its placeholder repo pool before the timed rounds start."""
+    deadline = time.time() + args.timeout
+    async with httpx.AsyncClient() as client:
+        while time.time() < deadline:
+            if (await client.get(f"{api_url}health")).json()["repo_pool"]["ready"] >= args.repo_pool:
+                return
+            await asyncio.sleep(0.2)
+    raise SystemExit("Repo pool did not fill up")
+
+
+def write_payloads(path, run_id, args, round_number, fake_url):
+    attachments = []
+    if args.attachment_size:
+        # Same content every round, so round 2 finds it unchanged
+        data = base64.b64encode(random.Random(0).randbytes(args.attachment_size)).decode("ascii")
+        attachments = [{"name": "data.bin", "url": f"data:application/octet-stream;base64,{data}"}]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(args.tasks):
+            f.write(json.dumps({
+                "email": "bench@example.com",
+                "secret": "bench",
+                "task": f"bench-{run_id}-{i}",
+                "round": round_number,
+                "nonce": f"{run_id}-{round_number}-{i}",
+                "brief": f"Benchmark app {i} round {round_number}",
+                "evaluation_url": f"{fake_url}/notify",
+                "attachments": attachments,
+            }) + "\n")
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+async def run_phase(round_number, run_id, args, api_url, fake_url, workdir):
+    payload_file = os.path.join(workdir, f"round{round_number}.jsonl")
+    write_payloads(payload_file, run_id, args, round_number, fake_url)
+    load_args = argparse.Namespace(
+        file=payload_file, url=api_url, requests=0, concurrency=args.concurrency, rate=args.rate,
+        arrival=args.arrival, burst_size=args.concurrency, secret=None, fresh_nonces=False,
+        wait=True, job_timeout=args.timeout, poll_interval=0.05, timeout=60.0,
+    )
+    fake_services.reset()
+    start = time.time()
+    records, _ = await run_load(load_args)
+
+    # Wait for the outbox to deliver every notification
+    expected = {r["nonce"] for r in records if r.get("job_status") == "succeeded"}
+    deadline = time.time() + args.timeout
+    while not expected <= set(fake_services.notifications) and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.time() - start
+
+    sent_at = {r["nonce"]: r["sent_at"] for r in records}
+    return {
+        "round": round_number,
+        "tasks": len(records),
+        "elapsed": elapsed,
+        "throughput": len(records) / elapsed,
+        "job_outcomes": {s: sum(1 for r in records if r.get("job_status") == s)
+                         for s in {r.get("job_status") for r in records}},
+        "post_latency": summarize([r["latency"] for r in records]),
+        "job_latency": summarize([r["end_to_end"] for r in records if "end_to_end" in r]),
+        "notified_latency": summarize([t - sent_at[n] for n, t in fake_services.notifications.items() if n in sent_at]),
+        "stages": {stage: summarize(values) for stage, values in fake_services.timings.items()},
+        "github_calls_per_task": fake_services._github.calls / max(1, len(records)),
+    }
+
+
+def print_phase(phase):
+    print(f"\n=== Round {phase['round']}: {phase['tasks']} tasks in {phase['elapsed']:.2f}s "
+          f"({phase['throughput']:.2f} tasks/s) ===")
+    print(f"Job outcomes: {phase['job_outcomes']}")
+    print(f"GitHub calls per task: {phase['github_calls_per_task']:.1f}")
+    rows = [("POST /", phase["post_latency"]), ("job finished", phase["job_latency"]),
+            ("evaluator notified", phase["notified_latency"])]
+    rows += [(f"stage: {stage}", stats) for stage, stats in sorted(phase["stages"].items())]
+    print(f"{'':24}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for label, stats in rows:
+        if stats:
+            print(f"{label:24}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}"
+                  f"{stats['p99']:>9.3f}{stats['max']:>9.3f}")
+
+
+async def main_async(args):
+    fake_services.config.latency = {"llm": args.llm_latency, "github": args.github_latency,
+                                    "notify": args.notify_latency}
+    fake_services.config.error_rate = {"llm": args.llm_error_rate, "github": args.github_error_rate,
+                                       "notify": args.notify_error_rate}
+    fake_services.config.slow_rate = args.llm_slow_rate
+    fake_services.config.app_files = args.app_files
+    fake_services.config.file_size = args.file_size
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}/"
+    server = start_fake_services(args.fake_port)
+    run_id = uuid.uuid4().hex[:6]
+    phases = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_api(args.api_port, fake_url, workdir, args)
+        try:
+            if args.repo_pool:
+                await wait_for_repo_pool(api_url, args)
+            phases.append(await run_phase(1, run_id, args, api_url, fake_url, workdir))
+            if args.revise:
+                phases.append(await run_phase(2, run_id, args, api_url, fake_url, workdir))
+        finally:
+            proc.terminate()
+            proc.wait()
+            server.should_exit = True
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    for phase in phases:
+        print_phase(phase)
+    print(f"\nAPI peak RSS: {peak_mb:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "phases": phases, "api_peak_rss_mb": peak_mb}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the App2App API.")
+    parser.add_argument("--tasks", type=int, default=50, help="Tasks submitted per round")
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum POSTs in flight")
+    parser.add_argument("--rate", type=float, default=50.0, help="Average arrival rate in tasks/second")
+    parser.add_argument("--arrival", choices=["constant", "poisson", "burst"], default="constant")
+    parser.add_argument("--workers", type=int, default=8, help="MAX_CONCURRENT_JOBS for the API")
+    parser.add_argument("--repo-pool", type=int, default=0,
+                        help="REPO_POOL_SIZE for the API; the pool is filled before round 1 starts")
+    parser.add_argument("--api-workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--revise", action="store_true", help="Also run a round 2 pass on the same tasks")
+    parser.add_argument("--cache", action="store_true", help="Leave the LLM generation cache enabled")
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--notify-latency", type=float, default=0.02)
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0,
+                        help="Fraction of LLM calls that are 10x slower (tail latency)")
+    parser.add_argument("--openai", action="store_true",
+                        help="Also configure the fake OpenAI-compatible provider")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--notify-error-rate", type=float, default=0.0)
+    parser.add_argument("--app-files", type=int, default=4, help="Files in each generated app")
+    parser.add_argument("--file-size", type=int, default=2000, help="Approximate bytes per generated file")
+    parser.add_argument("--attachment-size", type=int, default=0,
+                        help="Bytes of a random binary attachment sent with every task (0 = none)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for jobs and notifications")
+    parser.add_argument("--fake-port", type=int, default=8780)
+    parser.add_argument("--api-port", type=int, default=8781)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment variable for the API process (repeatable)")
+    parser.add_argument("--json", help="Write the full report to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the API's own output and logs")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Manual scripts that talk to a running server or print secrets; not unit tests
+collect_ignore = ["test_post.py", "test_load_env.py"]
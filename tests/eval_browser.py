@@ -0,0 +1,94 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+# Pages evaluated at the same time (one browser context each)
+EVAL_MAX_CONCURRENT_PAGES = int(os.getenv("EVAL_MAX_CONCURRENT_PAGES", "4"))
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium shared by all dynamic checks.
+
+    Evaluations run in the shared browser instead of launching one each
+    time, but every evaluation gets a new browser context that is closed
+    afterwards: submissions are all served from the same *.github.io
+    origin, so a reused context would carry localStorage, IndexedDB and
+    service workers from one submission into the next. Creating a context
+    takes milliseconds; launching the browser is what the pool saves. A
+    semaphore caps concurrent pages, and the browser is relaunched if it
+    crashes or disconnects.
+    """
+
+    def __init__(self, max_concurrency=EVAL_MAX_CONCURRENT_PAGES):
+        self.max_concurrency = max_concurrency
+        self._playwright = None
+        self._browser = None
+        self._open = 0
+        self._semaphore = None
+        self._lock = None
+
+    async def start(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._browser is None or not self._browser.is_connected():
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                print("🧭 Browser pool started")
+
+    async def stop(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    async def _new_context(self):
+        # Relaunch the browser if it crashed since the last evaluation
+        if self._browser is None or not self._browser.is_connected():
+            print("⚠️ Browser is not connected, relaunching")
+            await self.start()
+        return await self._browser.new_context()
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Open a page in a new, empty browser context (closed on exit):
+
+            async with browser_pool.page() as page:
+                await page.goto(url)
+        """
+        await self.start()
+        async with self._semaphore:
+            context = await self._new_context()
+            self._open += 1
+            try:
+                yield await context.new_page()
+            finally:
+                self._open -= 1
+                await self._close_context(context)
+
+    def stats(self):
+        return {
+            "connected": bool(self._browser and self._browser.is_connected()),
+            "open_contexts": self._open,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+browser_pool = BrowserPool()
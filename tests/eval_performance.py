@@ -0,0 +1,169 @@
+import os
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Main-thread tasks longer than this many milliseconds count as long tasks (the browser's own threshold is 50)
+EVAL_LONG_TASK_MS = float(os.getenv("EVAL_LONG_TASK_MS", "50"))
+# Milliseconds to wait for first contentful paint if the page has not painted by the time it loaded
+EVAL_PAINT_WAIT_MS = int(os.getenv("EVAL_PAINT_WAIT_MS", "3000"))
+
+# Installed before any page script runs: long tasks are not buffered by the
+# browser, so only an observer registered this early sees those during load
+INIT_SCRIPT = """
+(() => {
+    const perf = window.__app2appPerf = { longTasks: [] };
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                perf.longTasks.push(entry.duration);
+            }
+        }).observe({ type: "longtask", buffered: true });
+    } catch (e) {}
+})();
+"""
+
+COLLECT_SCRIPT = """
+async (paintWait) => {
+    // A page that has loaded but not painted yet gets a short grace period
+    let fcp = performance.getEntriesByName("first-contentful-paint")[0];
+    if (!fcp) {
+        fcp = await new Promise((resolve) => {
+            const timer = setTimeout(() => resolve(null), paintWait);
+            new PerformanceObserver((list, observer) => {
+                const entry = list.getEntriesByName("first-contentful-paint")[0];
+                if (entry) {
+                    clearTimeout(timer);
+                    observer.disconnect();
+                    resolve(entry);
+                }
+            }).observe({ type: "paint", buffered: true });
+        });
+    }
+    const nav = performance.getEntriesByType("navigation")[0];
+    const resources = performance.getEntriesByType("resource").map((r) => ({
+        type: r.initiatorType,
+        bytes: r.transferSize || 0,
+    }));
+    return {
+        navigation: nav ? {
+            ttfb: nav.responseStart - nav.startTime,
+            domContentLoaded: nav.domContentLoadedEventEnd - nav.startTime,
+            load: nav.loadEventEnd - nav.startTime,
+            bytes: nav.transferSize || 0,
+        } : null,
+        fcp: fcp ? fcp.startTime : null,
+        resources: resources,
+        longTasks: (window.__app2appPerf || { longTasks: [] }).longTasks,
+    };
+}
+"""
+
+
+def _ms(value):
+    return round(value, 1) if value is not None and value >= 0 else None
+
+
+class PerformanceRecorder:
+    """
+    Collects load performance of one page: navigation timing, first
+    contentful paint, bytes and requests per resource type, long tasks and
+    JS heap size.
+
+    Call attach() before page.goto() and collect() once the page has
+    loaded. Network accounting and the heap size come from a Chrome
+    DevTools Protocol session (encodedDataLength counts every response,
+    including cross-origin ones the Resource Timing API reports as 0
+    bytes); without CDP the in-page Resource Timing entries are used.
+    """
+
+    def __init__(self):
+        self._cdp = None
+        self._types = {}
+        self._requests = defaultdict(int)
+        self._bytes = defaultdict(int)
+        self._failed = 0
+
+    async def attach(self, page):
+        await page.add_init_script(INIT_SCRIPT)
+        try:
+            self._cdp = await page.context.new_cdp_session(page)
+            self._cdp.on("Network.requestWillBeSent", self._on_request)
+            self._cdp.on("Network.loadingFinished", self._on_finished)
+            self._cdp.on("Network.loadingFailed", self._on_failed)
+            await self._cdp.send("Network.enable")
+            await self._cdp.send("Performance.enable")
+        except Exception as e:
+            # Not Chromium, or CDP unavailable: fall back to Resource Timing
+            print(f"⚠️ CDP session unavailable, using Resource Timing only: {e}")
+            self._cdp = None
+
+    def _on_request(self, event):
+        self._types[event["requestId"]] = event.get("type", "Other").lower()
+
+    def _on_finished(self, event):
+        resource_type = self._types.get(event["requestId"], "other")
+        self._requests[resource_type] += 1
+        self._bytes[resource_type] += int(event.get("encodedDataLength", 0))
+
+    def _on_failed(self, event):
+        self._failed += 1
+        self._requests[self._types.get(event["requestId"], "other")] += 1
+
+    async def collect(self, page) -> dict:
+        data = await page.evaluate(COLLECT_SCRIPT, EVAL_PAINT_WAIT_MS)
+        nav = data.get("navigation") or {}
+        long_tasks = [d for d in data.get("longTasks", []) if d >= EVAL_LONG_TASK_MS]
+
+        metrics = {
+            "ttfb_ms": _ms(nav.get("ttfb")),
+            "dom_content_loaded_ms": _ms(nav.get("domContentLoaded")),
+            "load_ms": _ms(nav.get("load")),
+            "first_contentful_paint_ms": _ms(data.get("fcp")),
+            "long_tasks": {
+                "count": len(long_tasks),
+                "total_ms": round(sum(long_tasks), 1),
+                "max_ms": round(max(long_tasks), 1) if long_tasks else 0,
+            },
+        }
+
+        if self._cdp is not None:
+            by_type = {
+                t: {"requests": self._requests[t], "bytes": self._bytes[t]}
+                for t in sorted(self._requests)
+            }
+            metrics["failed_requests"] = self._failed
+        else:
+            by_type = defaultdict(lambda: {"requests": 0, "bytes": 0})
+            by_type["document"] = {"requests": 1, "bytes": nav.get("bytes", 0)}
+            for resource in data.get("resources", []):
+                by_type[resource["type"]]["requests"] += 1
+                by_type[resource["type"]]["bytes"] += resource["bytes"]
+            by_type = dict(sorted(by_type.items()))
+        metrics["resources"] = {
+            "requests": sum(t["requests"] for t in by_type.values()),
+            "bytes": sum(t["bytes"] for t in by_type.values()),
+            "by_type": by_type,
+        }
+
+        metrics["js_heap"] = None
+        if self._cdp is not None:
+            try:
+                values = {m["name"]: m["value"] for m in (await self._cdp.send("Performance.getMetrics"))["metrics"]}
+                metrics["js_heap"] = {
+                    "used_bytes": int(values.get("JSHeapUsedSize", 0)),
+                    "total_bytes": int(values.get("JSHeapTotalSize", 0)),
+                }
+            except Exception as e:
+                print(f"⚠️ Could not read JS heap size: {e}")
+        return metrics
+
+    async def detach(self):
+        if self._cdp is not None:
+            try:
+                await self._cdp.detach()
+            except Exception:
+                pass
+            self._cdp = None
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import git
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# "api": list the tree and read README.md through the GitHub API (no clone)
+# "clone": depth-1, blobless clone into a temporary directory that is removed afterwards
+EVAL_REPO_FETCH_MODE = os.getenv("EVAL_REPO_FETCH_MODE", "api")
+# Number of (repo_url, commit_sha) inspections kept in memory
+EVAL_REPO_CACHE_SIZE = int(os.getenv("EVAL_REPO_CACHE_SIZE", "512"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_inflight = {}
+
+
+def _owner_repo(repo_url: str) -> str:
+    return repo_url.rstrip("/").removesuffix(".git").split("github.com/")[-1]
+
+
+def _inspect_via_api(repo_url: str, commit_sha: str = None):
+    owner_repo = _owner_repo(repo_url)
+    ref = commit_sha or "HEAD"
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+
+    # One non-recursive tree listing gives the top-level file names
+    resp = requests.get(
+        f"https://api.github.com/repos/{owner_repo}/git/trees/{ref}",
+        headers=headers,
+        timeout=30,
+    )
+    resp.raise_for_status()
+    files = [entry["path"] for entry in resp.json()["tree"]]
+
+    readme = None
+    if "README.md" in files:
+        resp = requests.get(f"https://raw.githubusercontent.com/{owner_repo}/{ref}/README.md", timeout=30)
+        resp.raise_for_status()
+        readme = resp.text
+
+    return {"files": files, "readme": readme}
+
+
+def _inspect_via_clone(repo_url: str, commit_sha: str = None):
+    # The working directory is removed as soon as the inspection is done
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if commit_sha:
+            # Fetch exactly the notified commit: the default branch may have moved on since
+            repo = git.Repo.init(tmpdir)
+            repo.create_remote("origin", repo_url)
+            repo.git.fetch("--depth", "1", "--filter=blob:none", "origin", commit_sha)
+            commit = repo.commit("FETCH_HEAD")
+        else:
+            repo = git.Repo.clone_from(
+                repo_url,
+                tmpdir,
+                depth=1,
+                no_checkout=True,
+                multi_options=["--filter=blob:none"],
+            )
+            commit = repo.head.commit
+        tree = commit.tree
+        files = [item.name for item in tree]
+        readme = None
+        if "README.md" in files:
+            # Only this blob is downloaded on demand
+            readme = tree["README.md"].data_stream.read().decode("utf-8", errors="replace")
+        repo.close()
+    return {"files": files, "readme": readme}
+
+
+def inspect_repo_sync(repo_url: str, commit_sha: str = None):
+    """
+    List a repo's top-level files and read its README.md without a full clone.
+
+    Results for a known commit are cached, so re-notifications of the same
+    commit cost nothing.
+
+    Returns:
+        dict with "files" (top-level names) and "readme" (text or None)
+    """
+    key = (repo_url, commit_sha)
+    if commit_sha:
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+    if EVAL_REPO_FETCH_MODE == "clone":
+        result = _inspect_via_clone(repo_url, commit_sha)
+    else:
+        result = _inspect_via_api(repo_url, commit_sha)
+    print(f"✅ Inspected {repo_url} ({len(result['files'])} top-level entries)")
+
+    if commit_sha:
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > EVAL_REPO_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+
+async def inspect_repo(repo_url: str, commit_sha: str = None):
+    """
+    Async inspect_repo_sync: runs in a thread, and concurrent callers for the
+    same (repo_url, commit_sha) share a single fetch.
+    """
+    key = (repo_url, commit_sha)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(inspect_repo_sync, repo_url, commit_sha))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: a timed-out caller must not cancel the fetch other callers wait on
+    return await asyncio.shield(task)
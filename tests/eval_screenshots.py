@@ -0,0 +1,151 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+
+# Screenshots and their thumbnails, named by the SHA-256 of the rendered PNG
+EVAL_SCREENSHOT_DIR = os.getenv("EVAL_SCREENSHOT_DIR", "results/screenshots")
+# "webp" or "jpeg", and the encoder quality (1-100)
+EVAL_SCREENSHOT_FORMAT = os.getenv("EVAL_SCREENSHOT_FORMAT", "webp").lower()
+EVAL_SCREENSHOT_QUALITY = int(os.getenv("EVAL_SCREENSHOT_QUALITY", "80"))
+# Longest side of thumbnails, in pixels
+EVAL_THUMBNAIL_SIZE = int(os.getenv("EVAL_THUMBNAIL_SIZE", "320"))
+# Screenshots older than this many seconds are deleted...
+EVAL_SCREENSHOT_MAX_AGE = int(os.getenv("EVAL_SCREENSHOT_MAX_AGE", str(30 * 24 * 3600)))
+# ...and the oldest ones go first once the directory grows past this many bytes
+EVAL_SCREENSHOT_MAX_BYTES = int(os.getenv("EVAL_SCREENSHOT_MAX_BYTES", str(500 * 1024 * 1024)))
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ScreenshotStore:
+    """
+    Content-addressed store for evaluation screenshots.
+
+    Each PNG rendered by Playwright is hashed, compressed to WebP or JPEG and
+    written with a small thumbnail under its hash, so concurrent evaluations
+    never overwrite each other and identical renders are stored once. After
+    every save, files past the age limit are removed and the least recently
+    used screenshots are evicted until the directory fits the size budget.
+    """
+
+    def __init__(self, directory=EVAL_SCREENSHOT_DIR, image_format=EVAL_SCREENSHOT_FORMAT,
+                 quality=EVAL_SCREENSHOT_QUALITY, thumbnail_size=EVAL_THUMBNAIL_SIZE,
+                 max_age=EVAL_SCREENSHOT_MAX_AGE, max_bytes=EVAL_SCREENSHOT_MAX_BYTES):
+        if image_format not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported screenshot format {image_format!r} (use webp or jpeg)")
+        self.directory = directory
+        self.format = image_format
+        self.quality = quality
+        self.thumbnail_size = thumbnail_size
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, sha256, thumbnail=False, image_format=None):
+        """File of a stored screenshot, or None if the hash is unknown or was evicted."""
+        image_format = image_format or self.format
+        if not isinstance(sha256, str) or not _SHA256.match(sha256) or image_format not in MEDIA_TYPES:
+            return None
+        suffix = ".thumb" if thumbnail else ""
+        path = os.path.join(self.directory, f"{sha256}{suffix}.{image_format}")
+        return path if os.path.exists(path) else None
+
+    def save(self, png):
+        """
+        Store one PNG screenshot (blocking: run it in a thread).
+
+        Returns:
+            dict with the screenshot's sha256, its stored size in bytes and the format
+        """
+        sha256 = hashlib.sha256(png).hexdigest()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{sha256}.{self.format}")
+        thumb_path = os.path.join(self.directory, f"{sha256}.thumb.{self.format}")
+
+        if os.path.exists(path) and os.path.exists(thumb_path):
+            # Same render as before: mark it as recently used
+            os.utime(path)
+            os.utime(thumb_path)
+        else:
+            with Image.open(io.BytesIO(png)) as image:
+                image = image.convert("RGB")
+                self._write(path, image)
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                self._write(thumb_path, image)
+
+        size = os.path.getsize(path)
+        # The screenshot just saved is kept even if it alone exceeds the budget
+        self.evict(keep=sha256)
+        return {"sha256": sha256, "bytes": size, "format": self.format}
+
+    def _write(self, path, image):
+        # Write to a temporary file and rename, so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format=self.format.upper(), quality=self.quality)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self, keep=None):
+        """
+        Apply the age limit and size budget, never removing the screenshot
+        whose hash is keep. Returns the number of screenshots removed.
+        """
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return 0
+            # Group each screenshot with its thumbnail by hash
+            groups = {}
+            for entry in os.scandir(self.directory):
+                sha256 = entry.name.split(".")[0]
+                if not _SHA256.match(sha256):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                paths, size, mtime = groups.get(sha256, ([], 0, 0))
+                groups[sha256] = (paths + [entry.path], size + stat.st_size, max(mtime, stat.st_mtime))
+
+            cutoff = time.time() - self.max_age if self.max_age else None
+            total = sum(size for _, size, _ in groups.values())
+            removed = 0
+            for sha256, (paths, size, mtime) in sorted(groups.items(), key=lambda g: g[1][2]):
+                if (cutoff is None or mtime >= cutoff) and total <= self.max_bytes:
+                    break
+                if sha256 == keep:
+                    continue
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                removed += 1
+            return removed
+
+    def stats(self):
+        with self._lock:
+            files = list(os.scandir(self.directory)) if os.path.isdir(self.directory) else []
+            return {
+                "screenshots": sum(1 for e in files if ".thumb." not in e.name and not e.name.startswith(".")),
+                "bytes": sum(e.stat().st_size for e in files),
+                "max_bytes": self.max_bytes,
+            }
+
+
+screenshot_store = ScreenshotStore()
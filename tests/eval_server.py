@@ -1,15 +1,18 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import os
-import tempfile
-import git
+import json
 from google import genai
 from dotenv import load_dotenv
-import json
-import sqlite3
-from datetime import datetime
-from playwright.async_api import async_playwright
 import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from tests.eval_browser import browser_pool
+from tests.eval_performance import PerformanceRecorder
+from tests.eval_screenshots import MEDIA_TYPES, screenshot_store
+from tests.eval_repo import inspect_repo
+from tests.eval_storage import ResultStore
 
 app = FastAPI(title="Local Evaluation Server")
 
@@ -21,44 +24,21 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 # Initialize the Gemini client
 client = genai.Client(api_key=GOOGLE_API_KEY)
 
-DB_PATH = "results/evaluations.db"
+DB_PATH = os.getenv("EVAL_DB_PATH", "results/evaluations.db")
 
 # -------------------------------
 # 🧩 DATABASE SETUP
 # -------------------------------
+result_store = ResultStore(DB_PATH)
+
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT,
-            repo_url TEXT,
-            pages_url TEXT,
-            brief TEXT,
-            results_json TEXT,
-            created_at TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    result_store.init()
+
 
 def save_result(email, repo_url, pages_url, brief, results):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO results (email, repo_url, pages_url, brief, results_json, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        email,
-        repo_url,
-        pages_url,
-        brief,
-        json.dumps(results, ensure_ascii=False, indent=2),
-        datetime.utcnow().isoformat()
-    ))
-    conn.commit()
-    conn.close()
+    return result_store.save(email, repo_url, pages_url, brief, results)
+
 
 init_db()
 
@@ -67,14 +47,20 @@ init_db()
 # -------------------------------
 async def run_dynamic_checks(url: str):
     results = {}
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+    async with browser_pool.page() as page:
+        recorder = PerformanceRecorder()
         try:
+            await recorder.attach(page)
             await page.goto(url, timeout=15000)
             results["reachable"] = True
             results["title"] = await page.title()
 
+            # Load performance, measured before the click can navigate away
+            try:
+                results["performance"] = await recorder.collect(page)
+            except Exception as e:
+                results["performance"] = {"error": str(e)}
+
             header_text = await page.text_content("h1") or "No header found"
             results["header"] = header_text.strip() if header_text else None
 
@@ -87,99 +73,225 @@ async def run_dynamic_checks(url: str):
             else:
                 results["button_clicked"] = False
 
-            # Screenshot capture
-            screenshot_path = os.path.join(tempfile.gettempdir(), "dynamic_check.png")
-            await page.screenshot(path=screenshot_path)
-            results["screenshot"] = screenshot_path
+            # Screenshot capture, stored under its content hash (served by /results/{id}/screenshot)
+            png = await page.screenshot()
+            results["screenshot"] = await asyncio.to_thread(screenshot_store.save, png)
 
         except Exception as e:
             results["error"] = str(e)
             results["reachable"] = False
         finally:
-            await browser.close()
+            await recorder.detach()
 
     return results
 
+
+@app.on_event("startup")
+async def startup():
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Dynamic checks retry the launch on first use
+        print(f"⚠️ Could not start browser pool: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await browser_pool.stop()
+    result_store.close()
+
 # -------------------------------
-# 🧠 MAIN EVALUATION ENTRYPOINT
+# 🧪 EVALUATION STAGES
 # -------------------------------
-@app.post("/notify")
-async def receive_notification(payload: dict):
-    print("📩 Received notification from student API:")
-    print(payload)
+# Per-stage timeouts in seconds
+STAGE_TIMEOUTS = {
+    "static_checks": float(os.getenv("EVAL_STATIC_TIMEOUT", "120")),
+    "llm_review": float(os.getenv("EVAL_LLM_TIMEOUT", "60")),
+    "dynamic_checks": float(os.getenv("EVAL_DYNAMIC_TIMEOUT", "60")),
+}
+# Evaluations of one POST /notify/batch run at the same time
+EVAL_BATCH_CONCURRENCY = int(os.getenv("EVAL_BATCH_CONCURRENCY", str(browser_pool.max_concurrency)))
+
+
+def review_readme(brief: str, readme_text: str) -> str:
+    print("🤖 Sending README to Gemini for evaluation...")
+    response = client.models.generate_content(
+        model="gemini-2.0-flash",
+        contents=f"""
+        You are an instructor evaluating a student's auto-generated web app.
+        The student's brief was: {brief}
+
+        Here is the README content:
+        {readme_text}
+
+        Provide short constructive feedback (2-3 sentences)
+        on how well the README matches the task and explains the app.
+        """
+    )
+    return response.text
+
+
+async def run_static_checks(repo_url: str, commit_sha: str):
+    files = (await inspect_repo(repo_url, commit_sha))["files"]
+    return {
+        "has_license": "LICENSE" in files,
+        "has_readme": "README.md" in files,
+        "has_index_html": "index.html" in files,
+        "has_code_files": any(f.endswith((".html", ".py", ".js")) for f in files),
+    }
+
+
+async def run_llm_review(repo_url: str, commit_sha: str, brief: str):
+    readme_text = (await inspect_repo(repo_url, commit_sha))["readme"]
+    if readme_text is None:
+        return {"readme_feedback": "No README.md found."}
+    return {"readme_feedback": await asyncio.to_thread(review_readme, brief, readme_text)}
+
+
+async def run_dynamic_stage(pages_url: str):
+    if not pages_url:
+        return {"skipped": "No deployment URL provided."}
+    print(f"🌐 Running dynamic checks on {pages_url} ...")
+    return await run_dynamic_checks(pages_url)
+
+
+async def run_stage(name: str, coro, timings: dict):
+    """Run one stage under its timeout, recording its duration and turning failures into an error entry."""
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coro, STAGE_TIMEOUTS[name])
+    except asyncio.TimeoutError:
+        print(f"⏱️ Stage {name} timed out")
+        return {"error": f"Timed out after {STAGE_TIMEOUTS[name]:.0f}s"}
+    except Exception as e:
+        print(f"❌ Stage {name} failed: {e}")
+        return {"error": str(e)}
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+async def evaluate(payload: dict) -> Tuple[int, dict]:
+    """
+    Run every evaluation stage for one notification and save the results.
+
+    Returns:
+        (result_id, results): the id the results are stored under, and the results
 
+    Raises:
+        ValueError: if the payload has no repo_url
+    """
     repo_url = payload.get("repo_url")
     brief = payload.get("brief", "(no brief provided)")
     email = payload.get("email", "unknown")
     pages_url = payload.get("pages_url")
+    commit_sha = payload.get("commit_sha")
 
     if not repo_url:
-        return JSONResponse(
-            status_code=400,
-            content={"status": "error", "message": "Missing repo_url in payload"},
-        )
+        raise ValueError("Missing repo_url in payload")
 
     print(f"🔍 Starting evaluation for repo: {repo_url}")
 
-    results = {"static_checks": {}, "llm_review": {}, "dynamic_checks": {}}
-
+    # Static, LLM and dynamic stages run concurrently; the static and LLM
+    # stages share one repo inspection
+    timings = {}
+    start = time.perf_counter()
+    static_checks, llm_review, dynamic_checks = await asyncio.gather(
+        run_stage("static_checks", run_static_checks(repo_url, commit_sha), timings),
+        run_stage("llm_review", run_llm_review(repo_url, commit_sha, brief), timings),
+        run_stage("dynamic_checks", run_dynamic_stage(pages_url), timings),
+    )
+    timings["total"] = round(time.perf_counter() - start, 3)
+
+    results = {
+        "static_checks": static_checks,
+        "llm_review": llm_review,
+        "dynamic_checks": dynamic_checks,
+        "timings": timings,
+    }
+
+    # Save results to DB
+    result_id = save_result(email, repo_url, pages_url, brief, results)
+    print(f"💾 Results saved for {email} as #{result_id}")
+    return result_id, results
+
+
+def parse_batch(body: bytes) -> List[dict]:
+    """
+    Notifications of a batch request: a JSON array, {"notifications": [...]}
+    or one JSON object per line (JSONL).
+
+    Raises:
+        ValueError: if the body is not valid JSON or JSONL
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    if text[0] in "[{":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = None  # several objects: JSONL
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            return data.get("notifications", [data])
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def stream_batch(notifications: List[dict]):
+    """
+    Evaluate notifications on EVAL_BATCH_CONCURRENCY workers and yield one
+    NDJSON line per notification, in completion order. If the client goes
+    away, evaluations not yet finished are cancelled.
+    """
+    pending = asyncio.Queue()
+    for index, payload in enumerate(notifications):
+        pending.put_nowait((index, payload))
+    done = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, payload = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            line = {"index": index, "repo_url": payload.get("repo_url") if isinstance(payload, dict) else None}
+            try:
+                if not isinstance(payload, dict):
+                    raise ValueError("Notification must be a JSON object")
+                result_id, results = await evaluate(payload)
+                line.update(status="evaluation_complete", result_id=result_id, results=results)
+            except Exception as e:
+                print(f"❌ Evaluation failed: {e}")
+                line.update(status="error", message=str(e))
+            await done.put(line)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(EVAL_BATCH_CONCURRENCY, len(notifications)))]
     try:
-        # Step 1: Clone repo
-        tmpdir = tempfile.mkdtemp()
-        git.Repo.clone_from(repo_url, tmpdir)
-        print(f"✅ Repo cloned to {tmpdir}")
-
-        files = os.listdir(tmpdir)
-        results["static_checks"]["has_license"] = "LICENSE" in files
-        results["static_checks"]["has_readme"] = "README.md" in files
-        results["static_checks"]["has_index_html"] = "index.html" in files
-        results["static_checks"]["has_code_files"] = any(
-            f.endswith((".html", ".py", ".js")) for f in files
-        )
+        for _ in range(len(notifications)):
+            line = await done.get()
+            yield json.dumps(line, default=str) + "\n"
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
-        # Step 2: LLM review
-        readme_path = os.path.join(tmpdir, "README.md")
-        if os.path.exists(readme_path):
-            with open(readme_path, "r", encoding="utf-8") as f:
-                readme_text = f.read()
-
-            print("🤖 Sending README to Gemini for evaluation...")
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=f"""
-                You are an instructor evaluating a student's auto-generated web app.
-                The student's brief was: {brief}
-
-                Here is the README content:
-                {readme_text}
-
-                Provide short constructive feedback (2-3 sentences)
-                on how well the README matches the task and explains the app.
-                """
-            )
-            results["llm_review"]["readme_feedback"] = response.text
-        else:
-            results["llm_review"]["readme_feedback"] = "No README.md found."
-
-        # Step 3: Dynamic checks
-        if pages_url:
-            print(f"🌐 Running dynamic checks on {pages_url} ...")
-            results["dynamic_checks"] = await run_dynamic_checks(pages_url)
-        else:
-            results["dynamic_checks"]["skipped"] = "No deployment URL provided."
-
-        # Step 4: Save results to DB
-        save_result(email, repo_url, pages_url, brief, results)
-        print(f"💾 Results saved for {email}")
 
+# -------------------------------
+# 🧠 MAIN EVALUATION ENTRYPOINT
+# -------------------------------
+@app.post("/notify")
+async def receive_notification(payload: dict):
+    print("📩 Received notification from student API:")
+    print(payload)
+
+    try:
+        result_id, results = await evaluate(payload)
+    except ValueError as e:
         return JSONResponse(
-            status_code=200,
-            content={
-                "status": "evaluation_complete",
-                "results": results,
-            },
+            status_code=400,
+            content={"status": "error", "message": str(e)},
         )
-
     except Exception as e:
         print(f"❌ Evaluation failed: {e}")
         return JSONResponse(
@@ -187,34 +299,99 @@ async def receive_notification(payload: dict):
             content={"status": "error", "message": str(e)},
         )
 
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "evaluation_complete",
+            "result_id": result_id,
+            "results": results,
+        },
+    )
+
+
+@app.post("/notify/batch")
+async def receive_batch(request: Request):
+    """
+    Evaluate many notifications over one connection. The body is a JSON
+    array, {"notifications": [...]} or JSONL; each result is streamed back
+    as an NDJSON line ({"index", "repo_url", "status", "result_id" and "results" | "message"})
+    as soon as it completes, and saved like a single /notify.
+    """
+    try:
+        notifications = parse_batch(await request.body())
+    except (ValueError, UnicodeDecodeError) as e:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": f"Invalid batch body: {e}"},
+        )
+
+    print(f"📦 Received batch of {len(notifications)} notifications")
+    return StreamingResponse(stream_batch(notifications), media_type="application/x-ndjson")
+
 
 # -------------------------------
 # HEALTH CHECK
 # -------------------------------
 @app.get("/health")
 async def health():
-    return {"status": "alive"}
+    return {"status": "alive", "browser_pool": browser_pool.stats(), "screenshots": screenshot_store.stats()}
 
 # -------------------------------
 # 🧾 VIEW SAVED RESULTS
 # -------------------------------
 @app.get("/results")
-async def get_all_results():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    # Select all columns
-    cur.execute("SELECT id, email, repo_url, pages_url, brief, results_json, created_at FROM results ORDER BY id DESC")
-    rows = cur.fetchall()
-    conn.close()
-
-    return {"results": [
-        {
-            "id": r[0],
-            "email": r[1],
-            "repo_url": r[2],
-            "pages_url": r[3],
-            "results_json": json.loads(r[5]),  # parse the JSON string back to dict
-            "created_at": r[6]
-        }
-        for r in rows
-    ]}
\ No newline at end of file
+async def get_all_results(
+    limit: int = 50,
+    cursor: Optional[int] = None,
+    email: Optional[str] = None,
+    repo_url: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    reachable: Optional[bool] = None,
+    has_license: Optional[bool] = None,
+    has_readme: Optional[bool] = None,
+    has_index_html: Optional[bool] = None,
+    include_json: bool = True,
+):
+    """
+    Newest results first, one page at a time. Pass the returned next_cursor
+    as ?cursor= to get the following page.
+    """
+    rows, next_cursor = await asyncio.to_thread(
+        result_store.list,
+        limit=limit,
+        cursor=cursor,
+        email=email,
+        repo_url=repo_url,
+        since=since,
+        until=until,
+        include_json=include_json,
+        reachable=reachable,
+        has_license=has_license,
+        has_readme=has_readme,
+        has_index_html=has_index_html,
+    )
+    return {"results": rows, "next_cursor": next_cursor}
+
+
+@app.get("/results/{result_id}/screenshot")
+async def get_screenshot(result_id: int, thumbnail: bool = False):
+    """Screenshot (or its thumbnail with ?thumbnail=true) taken during a result's dynamic checks."""
+    results = await asyncio.to_thread(result_store.get, result_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"No result with id {result_id}")
+    screenshot = (results.get("dynamic_checks") or {}).get("screenshot")
+    if not isinstance(screenshot, dict):
+        # Missing, or a temp-file path from before screenshots were stored
+        raise HTTPException(status_code=404, detail="No stored screenshot for this result")
+    sha256 = screenshot.get("sha256")
+    image_format = screenshot.get("format", screenshot_store.format)
+    path = screenshot_store.path(sha256, thumbnail=thumbnail, image_format=image_format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Screenshot was evicted from the store")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[image_format],
+        # Content-addressed, so the file at this hash never changes
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{sha256}"'},
+    )
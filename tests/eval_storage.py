@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Saved results are written in batches of this many rows...
+EVAL_DB_BATCH_SIZE = int(os.getenv("EVAL_DB_BATCH_SIZE", "50"))
+# ...or after this many seconds, whichever comes first
+EVAL_DB_FLUSH_INTERVAL = float(os.getenv("EVAL_DB_FLUSH_INTERVAL", "0.5"))
+# Largest page /results will return
+EVAL_RESULTS_MAX_LIMIT = 500
+
+# Key check outcomes stored as their own columns so they can be filtered and indexed
+SUMMARY_COLUMNS = {
+    "has_license": ("static_checks", "has_license"),
+    "has_readme": ("static_checks", "has_readme"),
+    "has_index_html": ("static_checks", "has_index_html"),
+    "has_code_files": ("static_checks", "has_code_files"),
+    "reachable": ("dynamic_checks", "reachable"),
+}
+
+
+def summarize(results):
+    """Pull the normalized check outcomes out of a results dict (None when absent)."""
+    summary = {}
+    for column, (section, key) in SUMMARY_COLUMNS.items():
+        value = (results.get(section) or {}).get(key)
+        summary[column] = None if value is None else int(bool(value))
+    return summary
+
+
+class ResultStore:
+    """
+    SQLite storage for evaluation results.
+
+    One shared connection in WAL mode serves every request. Writes are
+    buffered and committed in batches, reads flush pending writes first,
+    and listing uses keyset (cursor) pagination over indexed columns so
+    /results stays fast however many evaluations have been stored.
+
+    Row ids are allocated in memory when a result is saved, so callers get
+    the id right away without waiting for the batch to be written. This
+    relies on the store being the only writer to the database.
+    """
+
+    def __init__(self, path, batch_size=EVAL_DB_BATCH_SIZE, flush_interval=EVAL_DB_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending = []
+        self._flush_scheduled = False
+        self._conn = None
+        self._next_id = None
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def init(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT,
+                    repo_url TEXT,
+                    pages_url TEXT,
+                    brief TEXT,
+                    results_json TEXT,
+                    created_at TEXT
+                )
+            """)
+
+            # Add the normalized columns to databases created before they existed
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+            added = [column for column in SUMMARY_COLUMNS if column not in existing]
+            for column in added:
+                conn.execute(f"ALTER TABLE results ADD COLUMN {column} INTEGER")
+            if added:
+                self._backfill(conn)
+
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_email ON results (email, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_repo_url ON results (repo_url, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at)")
+            conn.commit()
+
+    def _backfill(self, conn):
+        rows = conn.execute("SELECT id, results_json FROM results").fetchall()
+        updates = []
+        for row_id, results_json in rows:
+            try:
+                summary = summarize(json.loads(results_json))
+            except (TypeError, ValueError):
+                continue
+            updates.append((*summary.values(), row_id))
+        assignments = ", ".join(f"{column} = ?" for column in SUMMARY_COLUMNS)
+        conn.executemany(f"UPDATE results SET {assignments} WHERE id = ?", updates)
+
+    def _allocate_id(self):
+        if self._next_id is None:
+            conn = self._connection()
+            # Like AUTOINCREMENT itself, never reuse the id of a deleted row
+            last = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'results'").fetchone()
+            highest = conn.execute("SELECT MAX(id) FROM results").fetchone()[0]
+            self._next_id = max(last[0] if last else 0, highest or 0) + 1
+        result_id = self._next_id
+        self._next_id += 1
+        return result_id
+
+    def save(self, email, repo_url, pages_url, brief, results):
+        """
+        Buffer one result; it is committed with the next batch.
+
+        Returns:
+            the id the result will be stored under
+        """
+        row = [
+            None,
+            email,
+            repo_url,
+            pages_url,
+            brief,
+            json.dumps(results, ensure_ascii=False, separators=(",", ":")),
+            datetime.utcnow().isoformat(),
+            *summarize(results).values(),
+        ]
+        with self._lock:
+            row[0] = result_id = self._allocate_id()
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+                return result_id
+            if self._flush_scheduled:
+                return result_id
+            self._flush_scheduled = True
+
+        try:
+            asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+        except RuntimeError:
+            # Not inside an event loop: nothing would run the timer, write now
+            self.flush()
+        return result_id
+
+    def flush(self):
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            columns = ", ".join(SUMMARY_COLUMNS)
+            placeholders = ", ".join("?" for _ in SUMMARY_COLUMNS)
+            conn = self._connection()
+            conn.executemany(f"""
+                INSERT INTO results (id, email, repo_url, pages_url, brief, results_json, created_at, {columns})
+                VALUES (?, ?, ?, ?, ?, ?, ?, {placeholders})
+            """, rows)
+            conn.commit()
+
+    def get(self, result_id):
+        """Return the decoded results_json of one result, or None if there is no such id."""
+        self.flush()
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT results_json FROM results WHERE id = ?", (int(result_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, limit=50, cursor=None, email=None, repo_url=None, since=None, until=None,
+             include_json=True, **checks):
+        """
+        Return one page of results, newest first.
+
+        Args:
+            limit: page size (capped at EVAL_RESULTS_MAX_LIMIT)
+            cursor: id returned as next_cursor by the previous page
+            email, repo_url: exact-match filters
+            since, until: ISO timestamps bounding created_at
+            include_json: also decode and return results_json
+            checks: filters on the normalized columns, e.g. reachable=True
+
+        Returns:
+            (rows, next_cursor) where next_cursor is None on the last page
+        """
+        limit = max(1, min(int(limit), EVAL_RESULTS_MAX_LIMIT))
+        clauses, params = [], []
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        for column, value in (("email", email), ("repo_url", repo_url)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        for column, value in checks.items():
+            if column in SUMMARY_COLUMNS and value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(int(bool(value)))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        json_column = "results_json" if include_json else "NULL"
+        summary_columns = ", ".join(SUMMARY_COLUMNS)
+
+        self.flush()
+        with self._lock:
+            rows = self._connection().execute(f"""
+                SELECT id, email, repo_url, pages_url, {json_column}, created_at, {summary_columns}
+                FROM results {where}
+                ORDER BY id DESC LIMIT ?
+            """, (*params, limit)).fetchall()
+
+        results = []
+        for r in rows:
+            item = {
+                "id": r[0],
+                "email": r[1],
+                "repo_url": r[2],
+                "pages_url": r[3],
+                "created_at": r[5],
+                "summary": {
+                    column: None if value is None else bool(value)
+                    for column, value in zip(SUMMARY_COLUMNS, r[6:])
+                },
+            }
+            if include_json:
+                item["results_json"] = json.loads(r[4])
+            results.append(item)
+
+        next_cursor = rows[-1][0] if len(rows) == limit else None
+        return results, next_cursor
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
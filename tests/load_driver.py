@@ -0,0 +1,191 @@
+"""
+Replay a JSONL file of task payloads against the API and report latency.
+
+Usage:
+    python -m tests.load_driver payloads.jsonl --url http://127.0.0.1:8000/ \
+        --concurrency 20 --rate 10 --arrival poisson --wait
+
+Each line of the file is one POST / payload (email, secret, task, round,
+nonce, brief, ...). Lines are replayed in order and cycled if --requests is
+larger than the file.
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def load_payloads(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def arrival_delays(mode, rate, burst_size):
+    """Yield the pause after each request, before the next one, for the chosen arrival process."""
+    if mode == "constant":
+        while True:
+            yield 1 / rate
+    elif mode == "poisson":
+        while True:
+            yield random.expovariate(rate)
+    elif mode == "burst":
+        # burst_size requests at once, then wait so the average rate is preserved
+        while True:
+            for _ in range(burst_size - 1):
+                yield 0.0
+            yield burst_size / rate
+    else:
+        raise ValueError(f"Unknown arrival mode {mode}")
+
+
+async def wait_for_job(client, base_url, nonce, timeout, poll_interval):
+    """Poll GET /jobs/{nonce} until the job finishes; returns its final status."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        resp = await client.get(f"{base_url.rstrip('/')}/jobs/{nonce}")
+        if resp.status_code == 200 and resp.json().get("status") in ("succeeded", "failed"):
+            return resp.json()["status"]
+        await asyncio.sleep(poll_interval)
+    return "timeout"
+
+
+async def send_one(client, args, index, payload, semaphore, records, scheduled):
+    # Latency is measured from the scheduled send time, not from when a
+    # concurrency slot frees up, so time spent queueing behind a burst is
+    # counted (otherwise the percentiles suffer from coordinated omission)
+    start = scheduled
+    record = {
+        "index": index,
+        "nonce": payload.get("nonce"),
+        "task": payload.get("task"),
+        "sent_at": time.time() - (time.perf_counter() - scheduled),
+    }
+    async with semaphore:
+        record["queue_wait"] = time.perf_counter() - start
+        try:
+            resp = await client.post(args.url, json=payload)
+            record["status"] = resp.status_code
+        except httpx.HTTPError as e:
+            record["status"] = "error"
+            record["error"] = type(e).__name__
+        record["latency"] = time.perf_counter() - start
+
+    # Polling happens outside the semaphore so it doesn't hold back new submissions
+    if args.wait and record["status"] == 200:
+        record["job_status"] = await wait_for_job(
+            client, args.url, payload["nonce"], args.job_timeout, args.poll_interval
+        )
+        record["end_to_end"] = time.perf_counter() - start
+    records.append(record)
+
+
+async def run(args):
+    payloads = list(load_payloads(args.file))
+    if not payloads:
+        raise SystemExit(f"No payloads found in {args.file}")
+    total = args.requests or len(payloads)
+    secret = args.secret or os.getenv("STUDENT_SECRET")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    records = []
+    tasks = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        delays = arrival_delays(args.arrival, args.rate, args.burst_size)
+        start = time.perf_counter()
+        # Requests follow a fixed schedule, so a slow event loop cannot stretch the arrival process either
+        scheduled = start
+        for index, payload in zip(range(total), itertools.cycle(payloads)):
+            payload = dict(payload)
+            if secret:
+                payload.setdefault("secret", secret)
+            if args.fresh_nonces:
+                payload["nonce"] = f"{payload.get('nonce', 'load')}-{uuid.uuid4().hex[:8]}"
+            tasks.append(asyncio.create_task(send_one(client, args, index, payload, semaphore, records, scheduled)))
+            scheduled += next(delays)
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return records, elapsed
+
+
+def report(records, elapsed, args):
+    statuses = {}
+    for record in records:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+
+    print(f"\nRequests: {len(records)} in {elapsed:.2f}s "
+          f"({len(records) / elapsed:.2f} req/s, arrival={args.arrival}, concurrency={args.concurrency})")
+    print(f"Status codes: {statuses}")
+
+    for label, key in (("Queue wait", "queue_wait"), ("POST latency", "latency"), ("End-to-end", "end_to_end")):
+        values = [r[key] for r in records if key in r]
+        if not values:
+            continue
+        print(f"{label} (s): p50={percentile(values, 50):.3f} p95={percentile(values, 95):.3f} "
+              f"p99={percentile(values, 99):.3f} max={max(values):.3f}")
+
+    if args.wait:
+        job_statuses = {}
+        for record in records:
+            if "job_status" in record:
+                job_statuses[record["job_status"]] = job_statuses.get(record["job_status"], 0) + 1
+        print(f"Job outcomes: {job_statuses}")
+
+    if args.output:
+        fields = ["index", "nonce", "task", "sent_at", "status", "queue_wait", "latency", "job_status", "end_to_end", "error"]
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for record in sorted(records, key=lambda r: r["index"]):
+                writer.writerow(record)
+        print(f"Per-request records written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay JSONL task payloads against the App2App API.")
+    parser.add_argument("file", help="JSONL file, one POST / payload per line")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/", help="API endpoint")
+    parser.add_argument("--requests", type=int, default=0, help="Requests to send (default: one per line)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=10.0, help="Average arrival rate in requests/second")
+    parser.add_argument("--arrival", choices=["constant", "poisson", "burst"], default="constant")
+    parser.add_argument("--burst-size", type=int, default=50, help="Requests per burst for --arrival burst")
+    parser.add_argument("--secret", help="Secret to use when a payload has none (default: STUDENT_SECRET)")
+    parser.add_argument("--fresh-nonces", action="store_true", help="Append a random suffix to every nonce")
+    parser.add_argument("--wait", action="store_true", help="Poll /jobs/{nonce} and report end-to-end latency")
+    parser.add_argument("--job-timeout", type=float, default=600.0, help="Seconds to wait for each job")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between job status polls")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout in seconds")
+    parser.add_argument("--output", help="Write per-request records to this CSV file")
+    args = parser.parse_args()
+    records, elapsed = asyncio.run(run(args))
+    report(records, elapsed, args)
+
+
+if __name__ == "__main__":
+    main()
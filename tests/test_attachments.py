@@ -0,0 +1,65 @@
+import base64
+import os
+
+import pytest
+
+from api.services import attachments
+from api.services.attachments import AttachmentError, store_attachment, store_attachments
+
+DATA = bytes(range(256)) * 5 + b"tail"
+
+
+def _data_uri(data, mime="application/octet-stream", wrap=None):
+    encoded = base64.b64encode(data).decode("ascii")
+    if wrap:
+        encoded = "\n".join(encoded[i:i + wrap] for i in range(0, len(encoded), wrap))
+    return f"data:{mime};base64,{encoded}"
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachments, "ATTACHMENTS_DIR", str(tmp_path / "attachments"))
+    return tmp_path / "attachments"
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 7, 13, 4096])
+@pytest.mark.parametrize("wrap", [None, 76, 3])
+def test_base64_split_at_any_chunk_boundary(monkeypatch, chunk, wrap):
+    monkeypatch.setattr(attachments, "DECODE_CHUNK", chunk)
+    stored = store_attachment({"name": "data.bin", "url": _data_uri(DATA, wrap=wrap)})
+    with open(stored.path, "rb") as f:
+        assert f.read() == DATA
+    assert stored.size == len(DATA)
+
+
+def test_truncated_base64_is_rejected(store_dir):
+    with pytest.raises(AttachmentError):
+        store_attachment({"name": "data.bin", "url": _data_uri(DATA)[:-1]})
+    assert os.listdir(store_dir) == []
+
+
+def test_oversized_attachment_is_rejected(monkeypatch, store_dir):
+    monkeypatch.setattr(attachments, "DECODE_CHUNK", 64)
+    with pytest.raises(AttachmentError):
+        store_attachment({"name": "data.bin", "url": _data_uri(DATA)}, limit=len(DATA) - 1)
+    # The partly written temporary file is removed
+    assert os.listdir(store_dir) == []
+
+
+def test_total_size_budget_skips_later_attachments(monkeypatch):
+    monkeypatch.setattr(attachments, "ATTACHMENTS_MAX_TOTAL_BYTES", len(DATA) + 10)
+    stored = store_attachments([
+        {"name": "a.bin", "url": _data_uri(DATA)},
+        {"name": "b.bin", "url": _data_uri(DATA[:100])},
+        {"name": "c.txt", "url": "data:text/plain,small"},
+    ])
+    assert [a.name for a in stored] == ["a.bin", "c.txt"]
+
+
+def test_identical_content_is_stored_once(store_dir):
+    first = store_attachment({"name": "one.bin", "url": _data_uri(DATA)})
+    second = store_attachment({"name": "../two.bin", "url": _data_uri(DATA, wrap=60)})
+    assert first.path == second.path
+    assert (first.name, second.name) == ("one.bin", "two.bin")
+    assert first.git_sha == second.git_sha
+    assert os.listdir(store_dir) == [first.sha256]
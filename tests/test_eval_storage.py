@@ -0,0 +1,42 @@
+import asyncio
+
+from tests.eval_storage import ResultStore
+
+
+def _results(reachable=True):
+    return {"static_checks": {"has_license": True}, "dynamic_checks": {"reachable": reachable}}
+
+
+def test_save_returns_the_id_before_the_batch_is_written(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), batch_size=10, flush_interval=60)
+    store.init()
+
+    async def run():
+        ids = [store.save(f"{i}@x.y", f"https://github.com/x/{i}", None, "brief", _results()) for i in range(3)]
+        assert ids == [1, 2, 3]
+        # Still buffered: the timer flush is a minute away
+        assert len(store._pending) == 3
+        assert store.get(ids[1]) == _results()
+        rows, _ = store.list(include_json=False)
+        assert [(row["id"], row["email"]) for row in rows] == [(3, "2@x.y"), (2, "1@x.y"), (1, "0@x.y")]
+
+    asyncio.run(run())
+    store.close()
+
+
+def test_ids_continue_after_a_restart_and_are_not_reused(tmp_path):
+    path = str(tmp_path / "results.db")
+    store = ResultStore(path, batch_size=10, flush_interval=60)
+    store.init()
+    store.save("a@x.y", "https://github.com/x/a", None, "brief", _results())
+    last = store.save("b@x.y", "https://github.com/x/b", None, "brief", _results())
+    store.flush()
+    store._connection().execute("DELETE FROM results WHERE id = ?", (last,))
+    store._connection().commit()
+    store.close()
+
+    reopened = ResultStore(path, batch_size=10, flush_interval=60)
+    reopened.init()
+    assert reopened.save("c@x.y", "https://github.com/x/c", None, "brief", _results(False)) == last + 1
+    assert reopened.get(last + 1) == _results(False)
+    reopened.close()
@@ -0,0 +1,46 @@
+import asyncio
+
+from api.services import github_service
+from api.services.utils import git_blob_sha
+
+
+def test_streamed_files_are_committed_inline_without_blob_uploads(monkeypatch):
+    calls = []
+    committed = {}
+
+    async def github_api(method, path, **kwargs):
+        calls.append((method, path))
+        raise AssertionError(f"unexpected GitHub call {method} {path}")
+
+    async def open_repo(task):
+        return {"html_url": f"https://github.com/me/{task}"}
+
+    async def get_head(task):
+        return "head", "tree", {"index.html": git_blob_sha("<h1>Same</h1>"), "LICENSE": "sha-license"}
+
+    async def ensure_pages(task, repo):
+        return f"https://me.github.io/{task}/"
+
+    async def commit_tree(task, head_sha, base_tree_sha, elements, message):
+        committed["elements"] = elements
+        return "new-commit"
+
+    async def files():
+        yield "index.html", "<h1>Same</h1>"
+        yield "app.js", "console.log(1)"
+
+    monkeypatch.setattr(github_service, "github_api", github_api)
+    monkeypatch.setattr(github_service, "get_head", get_head)
+    monkeypatch.setattr(github_service, "ensure_pages", ensure_pages)
+    monkeypatch.setattr(github_service, "commit_tree", commit_tree)
+
+    repo_url, commit_sha, pages_url, code_files = asyncio.run(
+        github_service.push_stream_to_github("task-1", files(), [], open_repo)
+    )
+    assert calls == []
+    assert commit_sha == "new-commit"
+    assert code_files == {"index.html": "<h1>Same</h1>", "app.js": "console.log(1)"}
+    # Unchanged files are left out; the rest go inline in the tree
+    assert committed["elements"] == [
+        {"path": "app.js", "mode": "100644", "type": "blob", "content": "console.log(1)"}
+    ]
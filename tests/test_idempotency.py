@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from api import main
+from api.services.idempotency import IdempotencyStore, idempotency_key
+from api.services.job_queue import JobQueue
+from api.services.state_store import StateStore
+
+
+async def _echo(payload):
+    return {"nonce": payload.nonce}
+
+
+async def _fail(payload):
+    raise RuntimeError("GitHub is down")
+
+
+def _payload(nonce="n-1", email="a@b.c", task="task-1"):
+    return SimpleNamespace(email=email, task=task, round=1, nonce=nonce)
+
+
+def _entries(store):
+    return [row[0] for row in store.execute("SELECT nonce FROM idempotency ORDER BY created_at")]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / "state.db"))
+
+
+def test_duplicate_attaches_to_the_existing_job(store):
+    async def run():
+        queue = JobQueue(store=store)
+        idempotency = IdempotencyStore(store=store)
+        await queue.start()
+        try:
+            key = idempotency_key("a@b.c", "task-1", 1, "n-1")
+            first, duplicate = idempotency.submit_once(key, lambda: queue.submit("n-1", _echo, _payload()), queue.get)
+            assert not duplicate
+            await asyncio.wait_for(first.done.wait(), 5)
+            again, duplicate = idempotency.submit_once(
+                key, lambda: pytest.fail("a duplicate must not be submitted"), queue.get
+            )
+            assert duplicate and again.result == {"nonce": "n-1"}
+            assert idempotency.stats()["duplicates"] == 1
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_retry_of_a_failed_job_runs_again(store):
+    async def run():
+        queue = JobQueue(store=store)
+        idempotency = IdempotencyStore(store=store)
+        await queue.start()
+        try:
+            key = idempotency_key("a@b.c", "task-1", 1, "n-1")
+            first, _ = idempotency.submit_once(key, lambda: queue.submit("n-1", _fail, _payload()), queue.get)
+            await asyncio.wait_for(first.done.wait(), 5)
+            assert first.status == "failed"
+            retry, duplicate = idempotency.submit_once(key, lambda: queue.submit("n-1", _echo, _payload()), queue.get)
+            assert not duplicate
+            await asyncio.wait_for(retry.done.wait(), 5)
+            assert retry.status == "succeeded"
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_the_ttl(store, monkeypatch):
+    idempotency = IdempotencyStore(ttl=60, store=store)
+    job = SimpleNamespace(nonce="n-1", status="succeeded")
+    now = [1000.0]
+    monkeypatch.setattr("api.services.idempotency.time", SimpleNamespace(time=lambda: now[0]))
+
+    idempotency.submit_once("key-1", lambda: job, lambda nonce: job)
+    now[0] += 59
+    assert idempotency.submit_once("key-1", lambda: pytest.fail("still remembered"), lambda nonce: job)[1]
+    now[0] += 2
+    _, duplicate = idempotency.submit_once("key-1", lambda: job, lambda nonce: job)
+    assert not duplicate
+
+
+def test_oldest_entries_are_evicted_beyond_max_entries(store, monkeypatch):
+    idempotency = IdempotencyStore(max_entries=2, store=store)
+    now = [1000.0]
+    monkeypatch.setattr("api.services.idempotency.time", SimpleNamespace(time=lambda: now[0]))
+    for i in range(4):
+        now[0] += 1
+        job = SimpleNamespace(nonce=f"n-{i}", status="queued")
+        idempotency.submit_once(f"key-{i}", lambda: job, lambda nonce: None)
+    assert _entries(store) == ["n-2", "n-3"]
+    now[0] += 1
+    idempotency.submit_once("key-4", lambda: SimpleNamespace(nonce="n-4"), lambda nonce: None)
+    assert _entries(store) == ["n-3", "n-4"]
+
+
+def test_reused_nonce_from_another_request_gets_409(store, monkeypatch):
+    queue = JobQueue(store=store)
+    monkeypatch.setattr(main, "job_queue", queue)
+    monkeypatch.setattr(main, "idempotency_store", IdempotencyStore(store=store))
+    monkeypatch.setattr(main, "STUDENT_SECRET", "s3cret")
+    monkeypatch.setattr(main, "handle_build_request", _echo)
+
+    def request(email, task):
+        return main.RequestPayload(email=email, secret="s3cret", task=task, round=1, nonce="n-1")
+
+    async def run():
+        await queue.start()
+        try:
+            first = await main.handle_request(request("a@b.c", "task-1"), None)
+            assert first.status_code == 200
+            with pytest.raises(HTTPException) as conflict:
+                await main.handle_request(request("x@y.z", "task-2"), None)
+            assert conflict.value.status_code == 409
+            # The conflicting request left no idempotency entry behind
+            assert _entries(store) == ["n-1"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
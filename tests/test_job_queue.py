@@ -0,0 +1,131 @@
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api.services.idempotency import IdempotencyStore, idempotency_key
+from api.services.job_queue import Job, JobQueue, NonceConflictError
+from api.services.state_store import StateStore
+
+
+def _payload(nonce):
+    return SimpleNamespace(task="task-1", round=1, nonce=nonce)
+
+
+async def _never_finishes(payload):
+    await asyncio.Event().wait()
+
+
+async def _echo(payload):
+    return {"nonce": payload.nonce}
+
+
+def test_restart_with_same_pid_fails_left_over_jobs(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    before = JobQueue(store=store)
+    # A previous run with this same pid left one job running and one queued
+    running = Job("n-running", _never_finishes, _payload("n-running"))
+    running.status = "running"
+    before._save(running)
+    before._save(Job("n-queued", _never_finishes, _payload("n-queued")))
+
+    async def restart():
+        queue = JobQueue(store=store)
+        await queue.start()
+        try:
+            assert queue.get("n-running").status == "failed"
+            assert queue.get("n-queued").status == "failed"
+
+            # A retry of the old request gets a fresh job that actually runs
+            key = idempotency_key("a@b.c", "task-1", 1, "n-queued")
+            idempotency = IdempotencyStore(store=store)
+            store.execute(
+                "INSERT INTO idempotency (key, nonce, created_at) VALUES (?, ?, ?)",
+                (key, "n-queued", time.time()),
+            )
+            job, duplicate = idempotency.submit_once(
+                key,
+                lambda: queue.submit("n-queued", _echo, _payload("n-queued")),
+                queue.get,
+            )
+            assert not duplicate
+            await asyncio.wait_for(job.done.wait(), 5)
+            assert job.status == "succeeded"
+        finally:
+            await queue.stop()
+
+    asyncio.run(restart())
+
+
+def test_stop_fails_queued_and_running_jobs(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+
+    async def run():
+        queue = JobQueue(concurrency=1, store=store)
+        await queue.start()
+        running = queue.submit("n-1", _never_finishes, _payload("n-1"))
+        queued = queue.submit("n-2", _never_finishes, _payload("n-2"))
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return running, queued
+
+    running, queued = asyncio.run(run())
+    for job in (running, queued):
+        assert job.status == "failed"
+        assert job.done.is_set()
+        row = store.execute("SELECT status, finished_at FROM jobs WHERE nonce = ?", (job.nonce,)).fetchone()
+        assert row[0] == "failed" and row[1] is not None
+
+
+def test_reused_nonce_from_a_different_request_is_rejected(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+
+    async def run():
+        queue = JobQueue(store=store)
+        await queue.start()
+        try:
+            first = queue.submit("n-1", _echo, _payload("n-1"), idempotency_key("a@b.c", "task-1", 1, "n-1"))
+            await asyncio.wait_for(first.done.wait(), 5)
+            with pytest.raises(NonceConflictError):
+                queue.submit("n-1", _echo, _payload("n-1"), idempotency_key("x@y.z", "task-2", 1, "n-1"))
+            # The original request's job is untouched, and retrying it is still allowed
+            assert queue.get("n-1").status == "succeeded"
+            retry = queue.submit("n-1", _echo, _payload("n-1"), idempotency_key("a@b.c", "task-1", 1, "n-1"))
+            await asyncio.wait_for(retry.done.wait(), 5)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_worker_survives_failing_saves(tmp_path, monkeypatch):
+    store = StateStore(str(tmp_path / "state.db"))
+
+    async def run():
+        queue = JobQueue(concurrency=1, store=store)
+        await queue.start()
+        save = queue._save
+        failures = {"left": 4}
+
+        def flaky_save(job):
+            # The first save of the job that starts running, then every final save attempt, fail
+            if job.nonce == "n-1" and job.status != "queued" and failures["left"] > 0:
+                failures["left"] -= 1
+                raise sqlite3.OperationalError("database is locked")
+            save(job)
+
+        monkeypatch.setattr(queue, "_save", flaky_save)
+        try:
+            first = queue.submit("n-1", _echo, _payload("n-1"))
+            await asyncio.wait_for(first.done.wait(), 5)
+            assert first.status == "failed"
+            # The single worker is still alive and runs the next job
+            second = queue.submit("n-2", _echo, _payload("n-2"))
+            await asyncio.wait_for(second.done.wait(), 5)
+            assert second.status == "succeeded"
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from api.services.json_stream import IncrementalFileParser
+
+FILES = {
+    "index.html": '<h1 class="title">Hi</h1>\n<script>console.log("a\\\\b")</script>',
+    "README.md": "# App\n\tTabbed line é \U0001F600",
+}
+
+
+def _feed_all(parser, chunks):
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return completed
+
+
+def test_one_character_chunks():
+    text = json.dumps(FILES, indent=2)
+    parser = IncrementalFileParser()
+    assert dict(_feed_all(parser, text)) == FILES
+    assert parser.done
+
+
+@pytest.mark.parametrize("split", range(1, 7))
+def test_escape_sequences_split_across_chunks(split):
+    # Splits land inside \", \\, \n and é for the various offsets
+    text = '{"a.txt": "q\\" b\\\\ n\\n u\\u00e9 end"}'
+    chunks = [text[i:i + split] for i in range(0, len(text), split)]
+    parser = IncrementalFileParser()
+    assert _feed_all(parser, chunks) == [("a.txt", 'q" b\\ n\n ué end')]
+    assert parser.done
+
+
+def test_surrogate_pair_split_between_chunks():
+    text = '{"emoji.txt": "\\ud83d\\ude00"}'
+    cut = text.index("\\ude00")
+    parser = IncrementalFileParser()
+    assert _feed_all(parser, [text[:cut - 2], text[cut - 2:cut + 3], text[cut + 3:]]) == [
+        ("emoji.txt", "\U0001F600")
+    ]
+
+
+def test_each_file_is_returned_when_its_value_closes():
+    parser = IncrementalFileParser()
+    assert parser.feed('{"a.txt": "one", "b.t') == [("a.txt", "one")]
+    assert parser.feed('xt": "tw') == []
+    assert parser.feed('o"}') == [("b.txt", "two")]
+    assert parser.done
+
+
+def test_preamble_before_the_object_is_skipped():
+    text = "Sure! Here are the files:\n```json\n" + json.dumps(FILES) + "\n```"
+    parser = IncrementalFileParser()
+    assert dict(_feed_all(parser, [text[:10], text[10:40], text[40:]])) == FILES
+    assert parser.done
+
+
+def test_non_string_value_marks_the_parser_failed():
+    parser = IncrementalFileParser()
+    assert parser.feed('{"a.txt": "ok", "b.json": {"x": 1}}') == [("a.txt", "ok")]
+    assert parser.failed
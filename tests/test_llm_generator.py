@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+from api.services import llm_generator
+
+
+def test_stream_stops_reading_the_llm_when_the_consumer_leaves(monkeypatch):
+    read = []
+
+    def stream(prompt):
+        yield '{"index.html": "<h1>Hi</h1>", '
+        for i in range(50):
+            read.append(i)
+            time.sleep(0.01)
+            yield f'"file{i}.js": "x", '
+        yield '"README.md": "done"}'
+
+    monkeypatch.setattr(llm_generator, "LLM_CACHE_BYPASS", True)
+    monkeypatch.setattr(llm_generator.llm_router, "stream", stream)
+
+    async def run():
+        files = llm_generator.stream_app_code("brief")
+        assert await files.__anext__() == ("index.html", "<h1>Hi</h1>")
+        # The upload of the first file failed: the consumer gives up
+        await files.aclose()
+        return len(read)
+
+    read_when_closed = asyncio.run(run())
+    # aclose() waited for the producer, which stopped at the next chunk
+    time.sleep(0.05)
+    assert len(read) == read_when_closed < 50
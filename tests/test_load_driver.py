@@ -0,0 +1,14 @@
+from itertools import islice
+
+from tests.load_driver import arrival_delays
+
+
+def test_burst_mode_sends_the_first_burst_right_away():
+    # Each delay is the pause after a request: a burst of 3, then the wait
+    delays = list(islice(arrival_delays("burst", rate=2, burst_size=3), 9))
+    assert delays == [0.0, 0.0, 1.5, 0.0, 0.0, 1.5, 0.0, 0.0, 1.5]
+
+
+def test_burst_mode_keeps_the_average_rate():
+    delays = list(islice(arrival_delays("burst", rate=4, burst_size=5), 5 * 20))
+    assert sum(delays) == 20 * 5 / 4
@@ -0,0 +1,65 @@
+import asyncio
+import sqlite3
+
+from api.services import notifier
+from api.services.notifier import NotificationOutbox
+
+
+def _status(outbox, row_id):
+    return outbox._execute("SELECT status, last_error FROM notifications WHERE id = ?", (row_id,)).fetchone()
+
+
+def test_invalid_url_is_failed_instead_of_left_delivering(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifier, "NOTIFY_MAX_ATTEMPTS", 1)
+    outbox = NotificationOutbox(str(tmp_path / "outbox.db"))
+
+    async def run():
+        await outbox.start()
+        try:
+            row_id = outbox.enqueue("http://[::1/x", {"nonce": "n-1"})
+            for _ in range(100):
+                if _status(outbox, row_id)[0] == "failed":
+                    break
+                await asyncio.sleep(0.02)
+            return row_id
+        finally:
+            await outbox.stop()
+
+    row_id = asyncio.run(run())
+    status, error = _status(outbox, row_id)
+    assert status == "failed"
+    assert "InvalidURL" in error or "Invalid" in error
+
+
+def test_dispatcher_survives_database_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifier, "NOTIFY_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(notifier, "NOTIFY_MAX_ATTEMPTS", 1)
+    outbox = NotificationOutbox(str(tmp_path / "outbox.db"))
+    release_dead = outbox._release_dead
+    calls = []
+
+    def flaky_release_dead():
+        calls.append(1)
+        # Call 1 is start()'s own replay; call 2 is the dispatcher's first iteration
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("database is locked")
+        return release_dead()
+
+    monkeypatch.setattr(outbox, "_release_dead", flaky_release_dead)
+
+    async def run():
+        await outbox.start()
+        try:
+            # The failure happens on the first dispatch; the row is only picked up if the loop kept going
+            row_id = outbox.enqueue("http://[::1/x", {"nonce": "n-1"})
+            for _ in range(100):
+                if _status(outbox, row_id)[0] == "failed":
+                    break
+                await asyncio.sleep(0.02)
+            return row_id
+        finally:
+            await outbox.stop()
+
+    row_id = asyncio.run(run())
+    assert _status(outbox, row_id)[0] == "failed"
+    assert len(calls) > 2
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from api.handlers import revise_handler
+from api.services import llm_generator
+from api.services.patching import PatchError, apply_patch, apply_revision, parse_hunks
+
+INDEX = "<html>\n<body>\n<h1>Old</h1>\n<p>text</p>\n</body>\n</html>\n"
+
+
+def test_hunk_with_wrong_line_number_is_found_nearby():
+    diff = "@@ -2,2 +2,2 @@\n <p>text</p>\n-</body>\n+<footer></footer></body>\n"
+    assert apply_patch(INDEX, diff) == INDEX.replace("</body>", "<footer></footer></body>")
+
+
+def test_hunk_hint_far_past_the_end_is_clamped():
+    diff = "@@ -500,2 +500,2 @@\n-<h1>Old</h1>\n+<h1>New</h1>\n <p>text</p>\n"
+    assert apply_patch(INDEX, diff) == INDEX.replace("Old", "New")
+
+
+def test_insertion_at_line_zero():
+    diff = "@@ -0,0 +1 @@\n+<!DOCTYPE html>\n"
+    assert apply_patch(INDEX, diff) == "<!DOCTYPE html>\n" + INDEX
+
+
+def test_double_dash_body_lines_are_not_file_headers():
+    original = "a\n-- old comment\nc\n"
+    diff = "--- a/x.sql\n+++ b/x.sql\n@@ -1,3 +1,3 @@\n a\n--- old comment\n+++ new comment\n c\n"
+    assert [op for op, _ in parse_hunks(diff)[0][2]] == [" ", "-", "+", " "]
+    assert apply_patch(original, diff) == "a\n++ new comment\nc\n"
+
+
+def test_crlf_line_endings_are_kept():
+    original = INDEX.replace("\n", "\r\n")
+    diff = "@@ -3 +3 @@\n-<h1>Old</h1>\n+<h1>New</h1>\n"
+    assert apply_patch(original, diff) == original.replace("Old", "New")
+
+
+def test_non_matching_hunk_is_rejected():
+    with pytest.raises(PatchError):
+        apply_patch(INDEX, "@@ -3 +3 @@\n-<h1>Something else</h1>\n+<h1>New</h1>\n")
+
+
+@pytest.mark.parametrize("path", ["../evil.html", "/etc/passwd", "a/../../b.js", "a\\b.js", "./index.html"])
+def test_path_traversal_is_rejected(path):
+    with pytest.raises(PatchError):
+        apply_revision({"index.html": INDEX}, {path: "x"}, {})
+
+
+@pytest.mark.parametrize("path", ["LICENSE", "data.csv"])
+def test_protected_files_cannot_be_rewritten_or_patched(path):
+    current = {"index.html": INDEX, "data.csv": "a,b\n"}
+    with pytest.raises(PatchError):
+        apply_revision(current, {path: "changed"}, {}, protected=["LICENSE", "data.csv"])
+    with pytest.raises(PatchError):
+        apply_revision(current, {}, {path: "@@ -1 +1 @@\n-a,b\n+c,d\n"}, protected=["LICENSE", "data.csv"])
+
+
+def test_revise_falls_back_to_full_generation_on_non_matching_hunk(monkeypatch):
+    response = {"patches": {"index.html": "@@ -3 +3 @@\n-<h1>Not there</h1>\n+<h1>New</h1>\n"}}
+    monkeypatch.setattr(llm_generator, "LLM_CACHE_BYPASS", True)
+    monkeypatch.setattr(llm_generator.llm_router, "generate", lambda prompt: json.dumps(response))
+    full_app = {"index.html": "<html>regenerated</html>"}
+    committed = {}
+
+    async def get_repo(task):
+        return {"full_name": f"me/{task}", "html_url": f"https://github.com/me/{task}"}
+
+    async def get_head(task):
+        return "commit", "tree", {"index.html": "sha-index", "LICENSE": "sha-license"}
+
+    async def read_files(task, wanted, max_bytes):
+        return {"index.html": INDEX}
+
+    async def commit_files(task, files, message, attachments, head):
+        committed.update(files)
+        return "new-sha", {"added": [], "modified": list(files), "unchanged": []}
+
+    monkeypatch.setattr(revise_handler, "store_attachments", lambda attachments: [])
+    monkeypatch.setattr(revise_handler, "get_repo", get_repo)
+    monkeypatch.setattr(revise_handler, "get_head", get_head)
+    monkeypatch.setattr(revise_handler, "read_files", read_files)
+    monkeypatch.setattr(revise_handler, "commit_files", commit_files)
+    monkeypatch.setattr(revise_handler, "generate_app_code", lambda brief, attachments: full_app)
+
+    payload = SimpleNamespace(
+        email="a@b.c", task="task-1", round=2, nonce="n-1", brief="New title",
+        attachments=[], evaluation_url=None,
+    )
+    result = asyncio.run(revise_handler.handle_revise_request(payload))
+    assert result["revise_mode"] == "full"
+    assert committed == full_app
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from api.services import github_service
+from api.services.github_service import RateLimitScheduler
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances it instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += max(0.0, seconds)
+        await _real_sleep(0)
+
+
+_real_sleep = asyncio.sleep
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(github_service, "time", clock)
+    monkeypatch.setattr(github_service.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def _acquire(scheduler, times=1):
+    async def run():
+        for _ in range(times):
+            await scheduler.acquire()
+    asyncio.run(run())
+
+
+def test_burst_is_sent_back_to_back_then_paced_at_the_rate(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=3, reserve=0)
+    _acquire(scheduler, 3)
+    assert clock.slept == []
+    start = clock.now
+    _acquire(scheduler, 2)
+    assert clock.now - start == pytest.approx(0.2)
+
+
+def test_bucket_refills_over_time_up_to_the_burst(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=5, reserve=0)
+    _acquire(scheduler, 5)
+    clock.now += 0.3
+    scheduler._refill()
+    assert scheduler.tokens == pytest.approx(3)
+    clock.now += 60
+    scheduler._refill()
+    assert scheduler.tokens == 5
+
+
+def test_retry_after_pauses_every_caller(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=5, reserve=0)
+    resp = FakeResponse(403, {"Retry-After": "30"}, "You have exceeded a secondary rate limit")
+    assert scheduler.update(resp) is True
+    start = clock.now
+    _acquire(scheduler)
+    assert clock.now - start == pytest.approx(30)
+    assert scheduler.throttled == 1
+
+
+def test_exhausted_quota_waits_for_the_reset(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=5, reserve=0)
+    reset = clock.now + 120
+    resp = FakeResponse(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}, "API rate limit exceeded")
+    assert scheduler.update(resp) is True
+    _acquire(scheduler)
+    assert clock.now == pytest.approx(reset)
+
+
+def test_reserve_is_not_spent_from_the_bucket(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=30, reserve=50)
+    reset = clock.now + 600
+    ok = FakeResponse(200, {"X-RateLimit-Remaining": "52", "X-RateLimit-Reset": str(reset)})
+    assert scheduler.update(ok) is False
+    # Two calls are left above the reserve; the third waits for the reset although the bucket is full
+    _acquire(scheduler, 2)
+    assert clock.now == 0.0
+    _acquire(scheduler)
+    assert clock.now == pytest.approx(reset)
+
+
+def test_successful_responses_do_not_pause(clock):
+    scheduler = RateLimitScheduler(rate=10, burst=5, reserve=0)
+    assert scheduler.update(FakeResponse(200, {"X-RateLimit-Remaining": "4000"})) is False
+    assert scheduler.paused_until == 0.0
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from api.services import repo_pool as repo_pool_module
+from api.services.github_client import GitHubError
+from api.services.repo_pool import RepoPool
+from api.services.state_store import StateStore
+
+
+def _status(store, name):
+    row = store.execute("SELECT status FROM repo_pool WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def test_restart_with_same_pid_releases_rows(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    pool = RepoPool(size=0, store=store)
+    for name, status in (("pool-a", "claiming"), ("pool-b", "creating"), ("pool-c", "ready")):
+        store.execute(
+            "INSERT INTO repo_pool (name, status, created_at, pid) VALUES (?, ?, 0, ?)",
+            (name, status, os.getpid()),
+        )
+
+    pool._recover()
+
+    rows = dict(store.execute("SELECT name, pid FROM repo_pool").fetchall())
+    assert "pool-a" not in rows
+    assert rows["pool-b"] is None
+    assert rows["pool-c"] == os.getpid()
+
+
+def test_failed_placeholder_is_kept_for_retry(tmp_path, monkeypatch):
+    store = StateStore(str(tmp_path / "state.db"))
+    pool = RepoPool(size=1, store=store)
+    created = []
+
+    async def create(name):
+        created.append(name)
+        return {"name": name}
+
+    async def pages_down(name, check=False):
+        raise RuntimeError("Pages API unavailable")
+
+    async def pages_up(name, check=False):
+        return None
+
+    monkeypatch.setattr(repo_pool_module, "get_or_create_repo", create)
+    monkeypatch.setattr(repo_pool_module, "enable_pages", pages_down)
+    [name] = pool._reserve()
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool._prepare(name))
+
+    # The created repo is still tracked, and the next refill finishes it
+    monkeypatch.setattr(repo_pool_module, "enable_pages", pages_up)
+    assert pool._reserve() == [name]
+    asyncio.run(pool._prepare(name))
+    assert _status(store, name) == "ready"
+    assert created == [name, name]
+
+
+def test_placeholder_without_pages_is_not_ready(tmp_path, monkeypatch):
+    store = StateStore(str(tmp_path / "state.db"))
+    pool = RepoPool(size=1, store=store)
+
+    async def create(name):
+        return {"name": name}
+
+    class Response:
+        status_code = 403
+        text = "Pages is not available for this repository"
+
+    async def pages_forbidden(method, path, **kwargs):
+        return Response()
+
+    monkeypatch.setattr(repo_pool_module, "get_or_create_repo", create)
+    monkeypatch.setattr("api.services.github_service.github_request", pages_forbidden)
+    [name] = pool._reserve()
+    with pytest.raises(GitHubError):
+        asyncio.run(pool._prepare(name))
+    assert _status(store, name) == "creating"
+
+
+def test_refill_loop_survives_database_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(repo_pool_module, "REPO_POOL_RETRY_DELAY", 0.01)
+    store = StateStore(str(tmp_path / "state.db"))
+    pool = RepoPool(size=1, store=store)
+    reserve = pool._reserve
+    calls = []
+
+    def flaky_reserve():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return reserve()
+
+    async def create(name):
+        return {"name": name}
+
+    async def pages_up(name, check=False):
+        return None
+
+    monkeypatch.setattr(pool, "_reserve", flaky_reserve)
+    monkeypatch.setattr(repo_pool_module, "get_or_create_repo", create)
+    monkeypatch.setattr(repo_pool_module, "enable_pages", pages_up)
+
+    async def run():
+        await pool.start()
+        try:
+            for _ in range(100):
+                if pool.stats()["ready"] == 1:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await pool.stop()
+
+    asyncio.run(run())
+    assert pool.stats()["ready"] == 1